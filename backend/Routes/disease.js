@@ -1,5 +1,6 @@
 import express from "express";
 import { spawn } from "child_process";
+import { randomUUID } from "crypto";
 import multer from "multer";
 import path from "path";
 import { fileURLToPath } from "url";
@@ -10,6 +11,9 @@ const router = express.Router();
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
+// Each Python run gets its own request id for the prediction audit log
+const pythonEnv = () => ({ ...process.env, INFERENCE_REQUEST_ID: randomUUID() });
+
 // Model paths
 const diabetesModel = path.join(__dirname, "..", "aimodels", "diabetes.pkl");
 const heartModel = path.join(__dirname, "..", "aimodels", "heart.pkl");
@@ -33,7 +37,7 @@ router.post("/diabetes", (req, res) => {
       "--loads",
       diabetesModel,
       JSON.stringify(data),
-    ]);
+    ], { env: pythonEnv() });
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
 
@@ -46,8 +50,9 @@ router.post("/diabetes", (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -55,6 +60,10 @@ router.post("/diabetes", (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
@@ -79,7 +88,7 @@ router.post("/heart", (req, res) => {
       "--loads",
       heartModel,
       JSON.stringify(data),
-    ]);
+    ], { env: pythonEnv() });
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
 
@@ -92,8 +101,9 @@ router.post("/heart", (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -101,6 +111,10 @@ router.post("/heart", (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
@@ -125,7 +139,7 @@ router.post("/kidney", (req, res) => {
       "--loads",
       kidneyModel,
       JSON.stringify(data),
-    ]);
+    ], { env: pythonEnv() });
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
 
@@ -138,8 +152,9 @@ router.post("/kidney", (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -147,6 +162,10 @@ router.post("/kidney", (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
@@ -171,7 +190,7 @@ router.post("/liver", (req, res) => {
       "--loads",
       liverModel,
       JSON.stringify(data),
-    ]);
+    ], { env: pythonEnv() });
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
 
@@ -184,8 +203,9 @@ router.post("/liver", (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -193,6 +213,10 @@ router.post("/liver", (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
@@ -217,7 +241,7 @@ router.post("/breast-cancer", (req, res) => {
       "--loads",
       breastCancerModel,
       JSON.stringify(data),
-    ]);
+    ], { env: pythonEnv() });
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
 
@@ -230,8 +254,9 @@ router.post("/breast-cancer", (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -239,6 +264,10 @@ router.post("/breast-cancer", (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
@@ -255,23 +284,41 @@ router.post("/breast-cancer", (req, res) => {
   }
 });
 
-// Multer storage configuration
-const storage = multer.diskStorage({
-  destination: function (req, file, cb) {
-    cb(null, path.resolve(`./public/uploads/`));
-  },
-  filename: function (req, file, cb) {
-    const fileName = `${Date.now()}-${file.originalname}`;
-    cb(null, fileName);
-  },
-});
-
-const upload = multer({ storage: storage });
+// Multer storage configuration. Uploads stay in memory and are piped to the
+// Python script's stdin; set PERSIST_UPLOADS=true to keep writing them to
+// public/uploads/ as before.
+const persistUploads = process.env.PERSIST_UPLOADS === "true";
+const storage = persistUploads
+  ? multer.diskStorage({
+      destination: function (req, file, cb) {
+        cb(null, path.resolve(`./public/uploads/`));
+      },
+      filename: function (req, file, cb) {
+        const fileName = `${Date.now()}-${file.originalname}`;
+        cb(null, fileName);
+      },
+    })
+  : multer.memoryStorage();
+
+// Uploads are buffered whole in memory, so cap their size (MAX_UPLOAD_BYTES,
+// default 10 MB)
+const maxUploadBytes = Number(process.env.MAX_UPLOAD_BYTES) || 10 * 1024 * 1024;
+const upload = multer({ storage: storage, limits: { fileSize: maxUploadBytes, files: 1 } });
+
+// upload.single("image") that answers oversized uploads with 413 instead of a 500
+const uploadImage = (req, res, next) => {
+  upload.single("image")(req, res, (error) => {
+    if (error instanceof multer.MulterError && error.code === "LIMIT_FILE_SIZE") {
+      return res.status(413).send("Image too large");
+    }
+    next(error);
+  });
+};
 
-router.post("/predict-pneumonia", upload.single("image"), (req, res) => {
+router.post("/predict-pneumonia", uploadImage, (req, res) => {
   try {
-    // Get the uploaded image file path
-    const imagePath = req.file.path;
+    // Image file path when persisted, otherwise "-" to read the bytes from stdin
+    const imageArg = req.file.path || "-";
 
     // Path to the Python script for pneumonia prediction
     const pythonScriptPathForPneumonia = path.join(__dirname, "..", "pneumonia.py");
@@ -280,8 +327,14 @@ router.post("/predict-pneumonia", upload.single("image"), (req, res) => {
     const pythonPath = process.env.PYTHON_PATH || "python";
     const pythonProcess = spawn(pythonPath, [
       pythonScriptPathForPneumonia,
-      imagePath,
-    ]);
+      imageArg,
+    ], { env: pythonEnv() });
+    if (!req.file.path) {
+      pythonProcess.stdin.on("error", (error) => {
+        console.error("Python stdin error:", error);
+      });
+      pythonProcess.stdin.end(req.file.buffer);
+    }
 
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
@@ -295,8 +348,9 @@ router.post("/predict-pneumonia", upload.single("image"), (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -304,6 +358,10 @@ router.post("/predict-pneumonia", upload.single("image"), (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
@@ -320,10 +378,10 @@ router.post("/predict-pneumonia", upload.single("image"), (req, res) => {
   }
 });
 
-router.post("/predict-malaria", upload.single("image"), (req, res) => {
+router.post("/predict-malaria", uploadImage, (req, res) => {
   try {
-    // Get the uploaded image file path
-    const imagePath = req.file.path;
+    // Image file path when persisted, otherwise "-" to read the bytes from stdin
+    const imageArg = req.file.path || "-";
 
     // Path to the Python script for malaria prediction
     const pythonScriptPathForMalaria = path.join(__dirname, "..", "malaria.py");
@@ -332,8 +390,14 @@ router.post("/predict-malaria", upload.single("image"), (req, res) => {
     const pythonPath = process.env.PYTHON_PATH || "python";
     const pythonProcess = spawn(pythonPath, [
       pythonScriptPathForMalaria,
-      imagePath,
-    ]);
+      imageArg,
+    ], { env: pythonEnv() });
+    if (!req.file.path) {
+      pythonProcess.stdin.on("error", (error) => {
+        console.error("Python stdin error:", error);
+      });
+      pythonProcess.stdin.end(req.file.buffer);
+    }
 
     let prediction = "";
     let responseSent = false; // Flag to track if response has been sent
@@ -347,8 +411,9 @@ router.post("/predict-malaria", upload.single("image"), (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ prediction });
@@ -356,6 +421,10 @@ router.post("/predict-malaria", upload.single("image"), (req, res) => {
       }
     });
 
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
+
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
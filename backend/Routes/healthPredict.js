@@ -1,5 +1,6 @@
 import express from "express";
 import { spawn } from "child_process";
+import { randomUUID } from "crypto";
 import path from "path";
 import { fileURLToPath } from "url";
 
@@ -9,8 +10,78 @@ const router = express.Router({ mergeParams: true });
 const __filename = fileURLToPath(import.meta.url);
 const __dirname = path.dirname(__filename);
 
+// Each Python run gets its own request id for the prediction audit log
+const pythonEnv = () => ({ ...process.env, INFERENCE_REQUEST_ID: randomUUID() });
+
 const pythonScriptPathForSymptoms = path.join(__dirname, "..", "symptoms.py");
 const symptomsModel = path.join(__dirname, "..", "aimodels", "svc.pkl");
+const pythonScriptPathForVocabulary = path.join(__dirname, "..", "symptom_vocab.py");
+
+// Symptom autocomplete is answered by one resident symptom_vocab.py --serve
+// process, one JSON line per query in order, so a keystroke costs a pipe
+// round-trip instead of a Python start-up. It is started on first use and
+// again after it exits.
+let vocabularyProcess = null;
+
+const startVocabularyProcess = () => {
+  const pythonPath = process.env.PYTHON_PATH || "python";
+  const child = spawn(pythonPath, [pythonScriptPathForVocabulary, "--serve"]);
+  child.pending = [];
+  let buffered = "";
+
+  child.stdout.on("data", (data) => {
+    buffered += data.toString();
+    let newline;
+    while ((newline = buffered.indexOf("\n")) >= 0) {
+      const line = buffered.slice(0, newline);
+      buffered = buffered.slice(newline + 1);
+      const callback = child.pending.shift();
+      if (callback) callback(null, line);
+    }
+  });
+
+  child.stderr.on("data", (data) => {
+    console.error("Symptom vocabulary error:", data.toString());
+  });
+
+  const fail = (error) => {
+    if (vocabularyProcess === child) vocabularyProcess = null;
+    while (child.pending.length) child.pending.shift()(error);
+  };
+  child.on("error", fail);
+  child.on("close", (code) => fail(new Error(`symptom_vocab.py exited with code ${code}`)));
+  child.stdin.on("error", fail);
+  return child;
+};
+
+router.get("/symptoms/suggest", (req, res) => {
+  const query = String(req.query.q || "");
+  const limit = Number(req.query.limit) || 10;
+  if (!query.trim()) {
+    return res.json({ suggestions: [] });
+  }
+  if (!vocabularyProcess) {
+    vocabularyProcess = startVocabularyProcess();
+  }
+  const child = vocabularyProcess;
+  child.pending.push((error, line) => {
+    if (error) {
+      console.error("Symptom vocabulary error:", error);
+      return res.status(500).send("Internal Server Error");
+    }
+    try {
+      const reply = JSON.parse(line);
+      if (reply.error) {
+        return res.status(400).json(reply);
+      }
+      res.json(reply);
+    } catch (parseError) {
+      console.error("Symptom vocabulary error:", parseError);
+      res.status(500).send("Internal Server Error");
+    }
+  });
+  child.stdin.write(JSON.stringify({ q: query, limit }) + "\n");
+});
 
 router.post("/symptoms", (req, res) => {
   let responseSent = false; // Flag to track if response has been sent
@@ -23,7 +94,7 @@ router.post("/symptoms", (req, res) => {
       "--loads",
       symptomsModel,
       JSON.stringify({ data }),
-    ]);
+    ], { env: pythonEnv() });
     let prediction;
     pythonProcess.stdout.on("data", (data) => {
       const dataString = data.toString();
@@ -35,14 +106,19 @@ router.post("/symptoms", (req, res) => {
       console.error("Python script error:", data.toString());
     });
 
-    pythonProcess.on("close", (code) => {
-      console.log("Python process closed with code:", code);
+    // Reply as soon as the script closes stdout; it may still be flushing
+    // its audit log before it exits
+    pythonProcess.stdout.on("end", () => {
       console.log("Prediction:", prediction);
       if (!responseSent) {
         res.json({ data: prediction });
         responseSent = true;
       }
     });
+
+    pythonProcess.on("close", (code) => {
+      console.log("Python process closed with code:", code);
+    });
     pythonProcess.on("error", (error) => {
       console.error("Python process error:", error);
       if (!responseSent) {
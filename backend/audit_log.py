@@ -0,0 +1,282 @@
+"""
+Append-only audit log of every prediction.
+
+Each prediction becomes one entry (request id, model, model version,
+inputs, outputs, latency). record() only encodes the entry and appends it
+to an in-memory buffer; a background writer flushes the buffer in one
+sequential write once it holds flush_bytes or every flush_interval
+seconds, and whatever is left is flushed at exit. The one-shot scripts
+call end_response() once their result is printed; it closes stdout, and
+the Node routes reply on stdout "end", so the exit-time flush runs after
+the response has gone out rather than in front of it.
+
+Segments are audit_logs/segment-<n>.log. A segment starts with MAGIC and
+holds frames of <payload length, crc32> followed by the JSON payload, so
+a torn tail after a crash is detected and skipped. Writers from several
+processes share the active segment under an flock and move on to the next
+segment before a batch would take it past segment_bytes (a batch is never
+split, so one oversized batch can overshoot).
+
+    audit.record(model, version, inputs, outputs, latency)
+    INFERENCE_AUDIT_DIR=<dir>        where segments are written
+    INFERENCE_AUDIT=0                disable auditing
+    INFERENCE_REQUEST_ID=<id>        request id set by the Node routes
+    end_response()                   close stdout once the result is printed
+    python audit_log.py [--model M] [--request-id ID] [--since TS] [--limit N] [--stats]
+"""
+import argparse
+import atexit
+import json
+import os
+import struct
+import sys
+import threading
+import time
+import uuid
+import zlib
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DIR = os.path.join(script_dir, "audit_logs")
+
+MAGIC = b'PAUDIT1\n'
+FRAME = struct.Struct('<II')  # payload length, crc32 of payload
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.log'
+
+
+def segment_name(index):
+    return f'{SEGMENT_PREFIX}{index:08d}{SEGMENT_SUFFIX}'
+
+
+def list_segments(directory):
+    """Segment paths in write order"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    names = sorted(n for n in names if n.startswith(SEGMENT_PREFIX) and n.endswith(SEGMENT_SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+def encode_entry(entry):
+    payload = json.dumps(entry, separators=(',', ':'), default=str).encode()
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+class AuditLog:
+    """Buffered audit writer with a background flusher and segment rotation"""
+
+    def __init__(self, directory=DEFAULT_DIR, segment_bytes=64 << 20, flush_bytes=1 << 20,
+                 flush_interval=1.0, enabled=True):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.flush_bytes = flush_bytes
+        self.flush_interval = flush_interval
+        self.enabled = enabled
+        self._buffer = []
+        self._buffered_bytes = 0
+        self._lock = threading.Lock()
+        self._wake = threading.Condition(self._lock)
+        self._write_lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+
+    def record(self, model, model_version, inputs, outputs, latency, request_id=None):
+        """Queue one prediction for the log; never touches the disk"""
+        if not self.enabled:
+            return
+        entry = {
+            'ts': time.time(),
+            'request_id': request_id or os.environ.get('INFERENCE_REQUEST_ID') or uuid.uuid4().hex,
+            'model': model,
+            'model_version': model_version,
+            'inputs': inputs,
+            'outputs': outputs,
+            'latency_ms': round(latency * 1000, 3),
+        }
+        try:
+            frame = encode_entry(entry)
+        except (TypeError, ValueError):
+            # Auditing must never fail a prediction
+            return
+        with self._lock:
+            self._buffer.append(frame)
+            self._buffered_bytes += len(frame)
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                self._thread.start()
+            if self._buffered_bytes >= self.flush_bytes:
+                self._wake.notify()
+
+    def _take(self):
+        with self._lock:
+            data = b''.join(self._buffer)
+            self._buffer = []
+            self._buffered_bytes = 0
+        return data
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                if self._buffered_bytes < self.flush_bytes:
+                    self._wake.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+            except OSError as e:
+                print(json.dumps({"audit_error": str(e)}), file=sys.stderr)
+
+    def flush(self):
+        """Write everything buffered so far as one append to the active segment"""
+        with self._write_lock:
+            data = self._take()
+            if data:
+                self._append(data)
+
+    def _append(self, data):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, '.lock'), 'a') as lock:
+            try:
+                import fcntl
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            segments = list_segments(self.directory)
+            path = segments[-1] if segments else os.path.join(self.directory, segment_name(1))
+            size = os.path.getsize(path) if segments else 0
+            if size > len(MAGIC) and size + len(data) > self.segment_bytes:
+                index = int(os.path.basename(path)[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]) + 1
+                path = os.path.join(self.directory, segment_name(index))
+                size = 0
+            with open(path, 'ab') as f:
+                f.write(data if size else MAGIC + data)
+
+    def close(self):
+        """Stop the writer thread and flush what is left"""
+        with self._lock:
+            self._closed = True
+            self._wake.notify()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        self.flush()
+
+
+def end_response():
+    """Flush the result and close the stdout pipe before any exit-time work.
+
+    fd 1 is pointed at /dev/null rather than closed, so a stray print later
+    on cannot fail.
+    """
+    try:
+        sys.stdout.flush()
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.close(devnull)
+    except OSError:
+        pass
+
+
+def _valid_frame(data, offset):
+    """Length of the valid frame at offset, or None"""
+    if offset + FRAME.size > len(data):
+        return None
+    length, crc = FRAME.unpack_from(data, offset)
+    end = offset + FRAME.size + length
+    if end > len(data) or zlib.crc32(data[offset + FRAME.size:end]) != crc:
+        return None
+    return length
+
+
+def read_segment(path, stats=None):
+    """Yield the entries of one segment.
+
+    A torn or corrupt frame (e.g. a writer killed mid-append) is skipped by
+    scanning forward to the next frame whose checksum matches, so entries
+    appended after a crash are still read.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    if not data.startswith(MAGIC):
+        if stats is not None:
+            stats['bad_segments'] = stats.get('bad_segments', 0) + 1
+        return
+    offset = len(MAGIC)
+    skipped = 0
+    while offset < len(data):
+        length = _valid_frame(data, offset)
+        if length is None:
+            offset += 1
+            skipped += 1
+            continue
+        start = offset + FRAME.size
+        try:
+            entry = json.loads(data[start:start + length])
+        except ValueError:
+            offset += 1
+            skipped += 1
+            continue
+        offset = start + length
+        yield entry
+    if stats is not None and skipped:
+        stats['torn_bytes'] = stats.get('torn_bytes', 0) + skipped
+
+
+def read_log(directory=DEFAULT_DIR, model=None, request_id=None, since=None, stats=None):
+    """Entries of every segment in write order, optionally filtered"""
+    for path in list_segments(directory):
+        for entry in read_segment(path, stats):
+            if model is not None and entry.get('model') != model:
+                continue
+            if request_id is not None and entry.get('request_id') != request_id:
+                continue
+            if since is not None and entry.get('ts', 0) < since:
+                continue
+            yield entry
+
+
+audit = AuditLog(
+    os.environ.get('INFERENCE_AUDIT_DIR') or DEFAULT_DIR,
+    enabled=os.environ.get('INFERENCE_AUDIT', '1') != '0',
+)
+
+
+def _close_on_exit():
+    try:
+        audit.close()
+    except OSError as e:
+        print(json.dumps({"audit_error": str(e)}), file=sys.stderr)
+atexit.register(_close_on_exit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Print prediction audit entries as JSON lines")
+    parser.add_argument('--dir', default=os.environ.get('INFERENCE_AUDIT_DIR') or DEFAULT_DIR)
+    parser.add_argument('--model')
+    parser.add_argument('--request-id')
+    parser.add_argument('--since', type=float, help="Unix timestamp")
+    parser.add_argument('--limit', type=int)
+    parser.add_argument('--stats', action='store_true', help="Print entry counts per model instead")
+    args = parser.parse_args()
+
+    audit.enabled = False
+    stats = {}
+    entries = read_log(args.dir, args.model, args.request_id, args.since, stats)
+    if args.stats:
+        per_model = {}
+        for entry in entries:
+            per_model[entry['model']] = per_model.get(entry['model'], 0) + 1
+        print(json.dumps({
+            "segments": len(list_segments(args.dir)),
+            "entries": per_model,
+            "torn_bytes": stats.get('torn_bytes', 0),
+            "bad_segments": stats.get('bad_segments', 0),
+        }))
+    else:
+        for i, entry in enumerate(entries):
+            if args.limit is not None and i >= args.limit:
+                break
+            print(json.dumps(entry))
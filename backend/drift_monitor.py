@@ -0,0 +1,381 @@
+"""
+Constant-memory input-drift monitoring for the prediction scripts.
+
+For every tabular model the monitor keeps, per feature, a count, missing
+count, running mean/variance and a histogram over the decile edges of the
+training data. For symptoms.py it keeps per-symptom counts. Updates are
+O(1) per request and the state never grows with traffic.
+
+The live state is compared against a reference snapshot of the training
+inputs (aimodels/drift_reference.json, written by retrain_models.py or
+built on demand). A feature is flagged when its population stability
+index (PSI), mean shift or missing rate diverges past the thresholds.
+
+    drift.observe(model, values)           record one request
+    drift.observe_symptoms(symptoms)       record one symptom request
+    drift.check()                          compare with the reference
+    INFERENCE_DRIFT_FILE=<path>            where one-shot scripts merge their
+                                           state on exit (default
+                                           drift_state/drift.json)
+    INFERENCE_DRIFT=0                      disable the exit-time merge
+    INFERENCE_DRIFT_WINDOW=<seconds>       length of a check window (3600)
+    python drift_monitor.py --check <state.json>
+    python drift_monitor.py --build-reference
+
+The merged state covers one window of traffic, not the process lifetime.
+The first merge after the window has run for INFERENCE_DRIFT_WINDOW
+seconds closes it: the closed window is checked against the reference,
+kept as <state>.previous.json with its report in <state>.report.json
+(flagged models also go to stderr, which the Node routes log), and a new
+empty window starts. So the periodic check runs as part of the one-shot
+scripts' exit and always compares recent traffic with the reference.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+REFERENCE_PATH = os.path.join(script_dir, "aimodels", "drift_reference.json")
+DEFAULT_STATE_PATH = os.path.join(script_dir, "drift_state", "drift.json")
+DRIFT_WINDOW = 3600.0  # seconds of traffic per check window
+
+N_BINS = 10
+PSI_THRESHOLD = 0.25
+MEAN_SHIFT_THRESHOLD = 0.5  # in reference standard deviations
+MISSING_RATE_THRESHOLD = 0.05
+SYMPTOM_SHIFT_THRESHOLD = 0.2  # total variation distance between symptom mixes
+MIN_SAMPLES = 100
+
+# Model label -> synthetic_data schema the model was trained on
+TABULAR_MODELS = ('diabetes', 'heart', 'kidney', 'liver', 'breast_cancer')
+SYMPTOM_MODEL = 'svc'
+
+
+def _psi(expected, actual):
+    """Population stability index between two histograms"""
+    expected = np.maximum(np.asarray(expected, dtype=np.float64) / max(np.sum(expected), 1), 1e-4)
+    actual = np.maximum(np.asarray(actual, dtype=np.float64) / max(np.sum(actual), 1), 1e-4)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def build_reference():
+    """Reference snapshot of the training inputs for every model"""
+    from synthetic_data import make_dataset, feature_names
+    from symptom_index import load_training_cached
+
+    reference = {}
+    for name in TABULAR_MODELS:
+        X, _ = make_dataset(name)
+        # Interior decile edges; the histogram has N_BINS buckets around them
+        edges = np.quantile(X, np.linspace(0, 1, N_BINS + 1)[1:-1], axis=0).T
+        bins = np.stack([np.bincount(np.searchsorted(e, col, side='right'), minlength=N_BINS)
+                         for e, col in zip(edges, X.T)])
+        reference[name] = {
+            'features': feature_names(name),
+            'edges': edges.tolist(),
+            'bins': bins.tolist(),
+            'mean': X.mean(axis=0).tolist(),
+            'std': X.std(axis=0).tolist(),
+            'missing_rate': [0.0] * X.shape[1],
+        }
+    matrix, _ = load_training_cached()
+    reference[SYMPTOM_MODEL] = {
+        'rows': int(len(matrix)),
+        'symptom_counts': matrix.sum(axis=0).astype(int).tolist(),
+    }
+    return reference
+
+
+def load_reference(path=REFERENCE_PATH):
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return build_reference()
+
+
+def save_reference(reference, path=REFERENCE_PATH):
+    from model_files import write_atomic
+    write_atomic(path, json.dumps(reference).encode())
+
+
+class _FeatureSketch:
+    """Fixed-size per-feature state for one model"""
+
+    def __init__(self, edges):
+        self.edges = np.asarray(edges, dtype=np.float64)  # (features, N_BINS - 1)
+        n = len(self.edges)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.missing = np.zeros(n, dtype=np.int64)
+        self.mean = np.zeros(n)
+        self.m2 = np.zeros(n)
+        self.bins = np.zeros((n, N_BINS), dtype=np.int64)
+
+    def update(self, raw_values):
+        n = len(self.edges)
+        values = np.full(n, np.nan)
+        for i, v in enumerate(raw_values[:n]):
+            try:
+                values[i] = float(v)
+            except (TypeError, ValueError):
+                pass
+        present = ~np.isnan(values)
+        self.missing += ~present
+        # Welford update for the present features
+        self.count += present
+        delta = np.where(present, values - self.mean, 0.0)
+        self.mean += np.where(present, delta / np.maximum(self.count, 1), 0.0)
+        self.m2 += np.where(present, delta * (np.nan_to_num(values) - self.mean), 0.0)
+        # Same bucketing as np.searchsorted(edges, v, side="right") in build_reference
+        bucket = (values[:, None] >= self.edges).sum(axis=1)
+        rows = np.flatnonzero(present)
+        self.bins[rows, bucket[rows]] += 1
+
+    def to_dict(self):
+        return {
+            'count': self.count.tolist(), 'missing': self.missing.tolist(),
+            'mean': self.mean.tolist(), 'm2': self.m2.tolist(), 'bins': self.bins.tolist(),
+        }
+
+    def merge(self, other):
+        """Combine with another sketch's state (Chan et al. parallel variance)"""
+        count = np.asarray(other['count'], dtype=np.int64)
+        mean = np.asarray(other['mean'])
+        total = self.count + count
+        delta = mean - self.mean
+        safe = np.maximum(total, 1)
+        self.m2 += np.asarray(other['m2']) + delta ** 2 * self.count * count / safe
+        self.mean += delta * count / safe
+        self.count = total
+        self.missing += np.asarray(other['missing'], dtype=np.int64)
+        self.bins += np.asarray(other['bins'], dtype=np.int64)
+
+
+class DriftMonitor:
+    """Streaming sketches per model, compared against a training-time reference"""
+
+    def __init__(self, reference=None):
+        self._reference = reference
+        self._lock = threading.Lock()
+        self._sketches = {}
+        self._symptom_counts = None
+        self._symptom_requests = 0
+
+    @property
+    def reference(self):
+        if self._reference is None:
+            self._reference = load_reference()
+        return self._reference
+
+    def _sketch(self, model):
+        sketch = self._sketches.get(model)
+        if sketch is None:
+            sketch = self._sketches[model] = _FeatureSketch(self.reference[model]['edges'])
+        return sketch
+
+    def observe(self, model, values):
+        """Record the raw input values of one tabular prediction"""
+        if model not in TABULAR_MODELS:
+            return
+        try:
+            with self._lock:
+                self._sketch(model).update(list(values))
+        except (OSError, KeyError, ValueError):
+            # Monitoring must never fail a prediction
+            pass
+
+    def observe_symptoms(self, symptoms):
+        """Record the normalized symptom keys of one symptoms.py request"""
+        from symptom_data import symptoms_dict
+
+        with self._lock:
+            if self._symptom_counts is None:
+                self._symptom_counts = np.zeros(len(symptoms_dict), dtype=np.int64)
+            for symptom in symptoms:
+                index = symptoms_dict.get(symptom)
+                if index is not None:
+                    self._symptom_counts[index] += 1
+            self._symptom_requests += 1
+
+    def state(self):
+        with self._lock:
+            state = {model: sketch.to_dict() for model, sketch in self._sketches.items()}
+            if self._symptom_counts is not None:
+                state[SYMPTOM_MODEL] = {
+                    'requests': self._symptom_requests,
+                    'symptom_counts': self._symptom_counts.tolist(),
+                }
+            return state
+
+    def merge_state(self, state):
+        with self._lock:
+            for model, data in state.items():
+                if model == SYMPTOM_MODEL:
+                    counts = np.asarray(data['symptom_counts'], dtype=np.int64)
+                    if self._symptom_counts is None:
+                        self._symptom_counts = np.zeros_like(counts)
+                    self._symptom_counts += counts
+                    self._symptom_requests += data['requests']
+                elif model in TABULAR_MODELS:
+                    self._sketch(model).merge(data)
+
+    def check(self, min_samples=MIN_SAMPLES):
+        """Compare every sketch with the reference and flag diverging inputs"""
+        report = {}
+        with self._lock:
+            for model, sketch in self._sketches.items():
+                ref = self.reference[model]
+                features = []
+                for i, name in enumerate(ref['features']):
+                    count = int(sketch.count[i])
+                    seen = count + int(sketch.missing[i])
+                    if seen == 0:
+                        continue
+                    mean = float(sketch.mean[i])
+                    std = float(np.sqrt(sketch.m2[i] / count)) if count else 0.0
+                    ref_std = ref['std'][i] or 1.0
+                    result = {
+                        'feature': name,
+                        'samples': seen,
+                        'psi': round(_psi(ref['bins'][i], sketch.bins[i]), 4) if count else None,
+                        'mean': mean,
+                        'std': std,
+                        'mean_shift': round((mean - ref['mean'][i]) / ref_std, 4) if count else None,
+                        'missing_rate': round(int(sketch.missing[i]) / seen, 4),
+                    }
+                    result['drift'] = seen >= min_samples and (
+                        (result['psi'] is not None and result['psi'] > PSI_THRESHOLD)
+                        or (result['mean_shift'] is not None and abs(result['mean_shift']) > MEAN_SHIFT_THRESHOLD)
+                        or result['missing_rate'] - ref['missing_rate'][i] > MISSING_RATE_THRESHOLD
+                    )
+                    features.append(result)
+                report[model] = {
+                    'drift': any(f['drift'] for f in features),
+                    'features': features,
+                }
+
+            if self._symptom_counts is not None and self._symptom_requests:
+                ref_counts = np.asarray(self.reference[SYMPTOM_MODEL]['symptom_counts'], dtype=np.float64)
+                live = self._symptom_counts / max(self._symptom_counts.sum(), 1)
+                expected = ref_counts / max(ref_counts.sum(), 1)
+                distance = float(np.abs(live - expected).sum() / 2)
+                shifted = np.argsort(-np.abs(live - expected))[:5]
+                from symptom_data import symptoms_dict
+                keys = sorted(symptoms_dict, key=symptoms_dict.get)
+                report[SYMPTOM_MODEL] = {
+                    'drift': self._symptom_requests >= min_samples and distance > SYMPTOM_SHIFT_THRESHOLD,
+                    'requests': self._symptom_requests,
+                    'total_variation': round(distance, 4),
+                    'most_shifted': [
+                        {'symptom': keys[i], 'live_share': round(float(live[i]), 4),
+                         'reference_share': round(float(expected[i]), 4)}
+                        for i in shifted
+                    ],
+                }
+        return report
+
+    def start_checking(self, interval=300.0, on_drift=None):
+        """Run check() every interval seconds from a daemon thread.
+
+        on_drift(report) is called when any model is flagged; by default the
+        flagged models are written to stderr.
+        """
+        def report_drift(report):
+            flagged = [model for model, result in report.items() if result['drift']]
+            print(json.dumps({"input_drift": flagged}), file=sys.stderr)
+
+        on_drift = on_drift or report_drift
+        stop = threading.Event()
+
+        def loop():
+            while not stop.wait(interval):
+                report = self.check()
+                if any(result['drift'] for result in report.values()):
+                    on_drift(report)
+        threading.Thread(target=loop, name='drift-check', daemon=True).start()
+        return stop
+
+    def merge_into_file(self, path, window=DRIFT_WINDOW, now=None):
+        """Add this process's sketches to the current window at path under an exclusive lock.
+
+        A stored window older than window seconds is closed first (see
+        close_window), so the state never accumulates past one window.
+        """
+        state = self.state()
+        if not state:
+            return
+        now = time.time() if now is None else now
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'a+') as f:
+            try:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            f.seek(0)
+            content = f.read()
+            try:
+                stored = json.loads(content) if content else {}
+            except ValueError:
+                stored = {}
+            window_start = stored.pop('window_start', now)
+            if now - window_start >= window:
+                self.close_window(path, stored, window_start, now)
+                stored, window_start = {}, now
+            combined = DriftMonitor(self.reference)
+            combined.merge_state(stored)
+            combined.merge_state(state)
+            merged = combined.state()
+            merged['window_start'] = window_start
+            f.seek(0)
+            f.truncate()
+            json.dump(merged, f)
+
+    def close_window(self, path, stored, window_start, window_end):
+        """Check a finished window and keep it, with its report, next to path"""
+        from model_files import write_atomic
+
+        closed = DriftMonitor(self.reference)
+        closed.merge_state(stored)
+        report = closed.check()
+        base = os.path.splitext(path)[0]
+        window = {'window_start': window_start, 'window_end': window_end}
+        write_atomic(base + '.previous.json', json.dumps(dict(stored, **window)).encode())
+        write_atomic(base + '.report.json', json.dumps(dict(window, report=report)).encode())
+        flagged = [model for model, result in report.items() if result['drift']]
+        if flagged:
+            print(json.dumps({"input_drift": flagged, "report": base + '.report.json'}), file=sys.stderr)
+        return report
+
+
+drift = DriftMonitor()
+
+if os.environ.get('INFERENCE_DRIFT', '1') != '0':
+    def _merge_on_exit(path=os.environ.get('INFERENCE_DRIFT_FILE') or DEFAULT_STATE_PATH):
+        try:
+            window = float(os.environ.get('INFERENCE_DRIFT_WINDOW') or DRIFT_WINDOW)
+            drift.merge_into_file(path, window)
+        except (OSError, KeyError, ValueError):
+            pass
+    atexit.register(_merge_on_exit)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("--check", "--build-reference"):
+        print(json.dumps({"error": "Usage: python drift_monitor.py --check <state.json> | --build-reference"}))
+        sys.exit(1)
+
+    if sys.argv[1] == "--build-reference":
+        save_reference(build_reference())
+        print(json.dumps({"reference": REFERENCE_PATH}))
+    else:
+        monitor = DriftMonitor()
+        with open(sys.argv[2]) as f:
+            monitor.merge_state(json.load(f))
+        report = monitor.check()
+        print(json.dumps(report, indent=2))
+        sys.exit(1 if any(result['drift'] for result in report.values()) else 0)
@@ -2,20 +2,19 @@ import sys
 import numpy as np
 import json
 import os
+import time
 
-# Import the safe model loader
-try:
-    from model_loader import load_model_safely
-except ImportError:
-    # Fallback to regular pickle if model_loader is not available
-    import pickle
-    def load_model_safely(path):
-        with open(path, 'rb') as f:
-            return pickle.load(f)
+# Import the model registry (loads through the safe model loader)
+from model_registry import get_model
+from inference_metrics import metrics, model_label
+from drift_monitor import drift
+from audit_log import audit, end_response
 
 # Get the directory of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
+request_start = time.perf_counter()
+
 try:
     # Parse command line arguments
     if len(sys.argv) < 4:
@@ -28,31 +27,42 @@ try:
     # If model path is relative, make it absolute
     if not os.path.isabs(model_path):
         model_path = os.path.join(script_dir, model_path)
+    model_name = model_label(model_path)
     
-    # Load the model using safe loader
-    model = load_model_safely(model_path)
+    # Load the model through the registry so the result can report its version
+    with metrics.time(model_name, "load"):
+        model_version = get_model(model_path)
+    model = model_version.model
     
     # Parse and prepare data
-    data = list(json.loads(data_json).values())
+    inputs = json.loads(data_json)
+    data = list(inputs.values())
+    drift.observe(model_name, data)
     data_array = np.array(data, dtype=np.float32).reshape(1, -1)
     
     # Make prediction
-    prediction = model.predict(data_array)
-    
-    # Try to get prediction probability if available
-    try:
-        if hasattr(model, 'predict_proba'):
-            probability = model.predict_proba(data_array)
-            result = {
-                "prediction": prediction.tolist(),
-                "probability": probability.tolist()
-            }
-        else:
+    with metrics.time(model_name, "predict"):
+        prediction = model.predict(data_array)
+    
+        # Try to get prediction probability if available
+        try:
+            if hasattr(model, 'predict_proba'):
+                probability = model.predict_proba(data_array)
+                result = {
+                    "prediction": prediction.tolist(),
+                    "probability": probability.tolist()
+                }
+            else:
+                result = {"prediction": prediction.tolist()}
+        except:
             result = {"prediction": prediction.tolist()}
-    except:
-        result = {"prediction": prediction.tolist()}
     
-    print(json.dumps(result))
+    result["model_version"] = model_version.version
+    with metrics.time(model_name, "serialize"):
+        print(json.dumps(result))
+    metrics.prediction(model_name)
+    audit.record(model_name, model_version.version, inputs, result, time.perf_counter() - request_start)
+    end_response()
     
 except FileNotFoundError as e:
     print(json.dumps({"error": f"Model file not found: {str(e)}"}))
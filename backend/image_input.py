@@ -0,0 +1,67 @@
+"""
+Image input for the CNN prediction scripts.
+
+The scripts accept an image in one of three ways:
+    <image_path>               read from disk (the original behaviour)
+    -                          raw image bytes on stdin
+    --shm <name> <size>        raw image bytes in a shared-memory segment
+
+For stdin and shared memory the image is decoded straight from memory,
+so no upload has to be written to public/uploads/ and read back.
+"""
+import hashlib
+import io
+import sys
+
+USAGE = "<image_path> | - | --shm <name> <size>"
+
+
+def _attach_shared_memory(name):
+    from multiprocessing import shared_memory
+    try:
+        # Python 3.13+: don't let the resource tracker unlink a segment we don't own
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+
+def read_shared_memory(name, size):
+    """Copy size bytes out of a shared-memory segment owned by the caller"""
+    shm = _attach_shared_memory(name)
+    try:
+        if size > shm.size:
+            raise ValueError(f"Shared memory segment {name} holds {shm.size} bytes, {size} requested")
+        return bytes(shm.buf[:size])
+    finally:
+        shm.close()
+
+
+def valid_args(argv):
+    if len(argv) == 2:
+        return argv[1] != '--shm'
+    return len(argv) == 4 and argv[1] == '--shm'
+
+
+def parse_image_source(argv):
+    """Return a path or an in-memory file for the image named by argv"""
+    if argv[1] == '-':
+        return io.BytesIO(sys.stdin.buffer.read())
+    if argv[1] == '--shm':
+        return io.BytesIO(read_shared_memory(argv[2], int(argv[3])))
+    return argv[1]
+
+
+def image_digest(source):
+    """sha256 and size of an image source, for the audit log"""
+    if isinstance(source, io.BytesIO):
+        data = source.getbuffer()
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    return {"image_sha256": hashlib.sha256(data).hexdigest(), "bytes": len(data)}
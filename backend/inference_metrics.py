@@ -0,0 +1,288 @@
+"""
+Low-overhead metrics for the Python inference layer.
+
+Counts predictions, errors and model cache hits, and records per-stage
+latency (load, predict, serialize) in fixed-bucket histograms, labelled
+by model. Recording is a dict lookup and a bisect under a lock, cheap
+enough to leave on permanently.
+
+Metrics are exposed in the Prometheus text format:
+    metrics.serve(port)            HTTP endpoint on 127.0.0.1:<port>/metrics
+    metrics.start_dumping(path)    rewrite a .prom file periodically
+    INFERENCE_METRICS_PORT=<port>  serve on import (long-running processes)
+    INFERENCE_METRICS_FILE=<path>  merge this process's metrics into <path>
+                                   on exit (one-shot prediction scripts)
+                                   and write the text format next to it;
+                                   metrics.prom keeps its state in
+                                   metrics.json, anything else in <path>
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Upper bounds in seconds; model loads land in the top buckets, predictions in the bottom ones
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+COUNTER_HELP = {
+    'inference_predictions_total': 'Predictions served',
+    'inference_errors_total': 'Failed inference stages',
+    'inference_model_cache_hits_total': 'Model lookups served by a resident model',
+    'inference_model_cache_misses_total': 'Model lookups that loaded the model file',
+}
+HISTOGRAM_NAME = 'inference_stage_duration_seconds'
+HISTOGRAM_HELP = 'Latency of each inference stage'
+
+
+def _key(name, labels):
+    return name + '|' + ','.join(f'{k}={v}' for k, v in labels)
+
+
+def _split_key(key):
+    name, _, labels = key.partition('|')
+    return name, [tuple(pair.split('=', 1)) for pair in labels.split(',') if pair]
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + ([extra] if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def render_state(state):
+    """Prometheus text exposition of a metrics snapshot"""
+    lines = []
+    counters = state.get('counters', {})
+    for name, help_text in COUNTER_HELP.items():
+        series = sorted(k for k in counters if _split_key(k)[0] == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for key in series:
+            lines.append(f'{name}{_format_labels(_split_key(key)[1])} {counters[key]}')
+
+    histograms = state.get('histograms', {})
+    buckets = state.get('buckets', list(DEFAULT_BUCKETS))
+    if histograms:
+        lines.append(f'# HELP {HISTOGRAM_NAME} {HISTOGRAM_HELP}')
+        lines.append(f'# TYPE {HISTOGRAM_NAME} histogram')
+    for key in sorted(histograms):
+        labels = _split_key(key)[1]
+        hist = histograms[key]
+        cumulative = 0
+        for bound, count in zip(list(buckets) + [float('inf')], hist['buckets']):
+            cumulative += count
+            le = ('le', _format_bound(bound))
+            lines.append(f'{HISTOGRAM_NAME}_bucket{_format_labels(labels, le)} {cumulative}')
+        lines.append(f'{HISTOGRAM_NAME}_sum{_format_labels(labels)} {hist["sum"]}')
+        lines.append(f'{HISTOGRAM_NAME}_count{_format_labels(labels)} {hist["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+def merge_state(into, other):
+    """Add the counts of one snapshot into another (bucket layouts must match)"""
+    for key, value in other.get('counters', {}).items():
+        into.setdefault('counters', {})[key] = into.get('counters', {}).get(key, 0) + value
+    for key, hist in other.get('histograms', {}).items():
+        target = into.setdefault('histograms', {}).get(key)
+        if target is None:
+            into['histograms'][key] = {'buckets': list(hist['buckets']), 'sum': hist['sum'], 'count': hist['count']}
+        else:
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], hist['buckets'])]
+            target['sum'] += hist['sum']
+            target['count'] += hist['count']
+    into['buckets'] = other.get('buckets', into.get('buckets'))
+    return into
+
+
+class Metrics:
+    """Thread-safe counters and fixed-bucket latency histograms"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        # key -> [bucket counts..., +Inf count], sum, count
+        self._histograms = {}
+        self._server = None
+        self._dump_thread = None
+
+    def increment(self, name, amount=1, **labels):
+        key = _key(name, sorted(labels.items()))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, model, stage, seconds):
+        key = _key(HISTOGRAM_NAME, (('model', model), ('stage', stage)))
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            hist[0][index] += 1
+            hist[1] += seconds
+            hist[2] += 1
+
+    @contextmanager
+    def time(self, model, stage):
+        """Time a stage; an exception is counted as an error of that stage and re-raised"""
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.error(model, stage)
+            raise
+        finally:
+            self.observe(model, stage, time.perf_counter() - start)
+
+    def prediction(self, model):
+        self.increment('inference_predictions_total', model=model)
+
+    def error(self, model, stage):
+        self.increment('inference_errors_total', model=model, stage=stage)
+
+    def cache_hit(self, model):
+        self.increment('inference_model_cache_hits_total', model=model)
+
+    def cache_miss(self, model):
+        self.increment('inference_model_cache_misses_total', model=model)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'buckets': list(self.buckets),
+                'counters': dict(self._counters),
+                'histograms': {
+                    key: {'buckets': list(h[0]), 'sum': h[1], 'count': h[2]}
+                    for key, h in self._histograms.items()
+                },
+            }
+
+    def render(self):
+        return render_state(self.snapshot())
+
+    def dump(self, path):
+        """Atomically write the Prometheus text to path"""
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp_path, path)
+
+    def start_dumping(self, path, interval=15.0):
+        """Rewrite path every interval seconds from a daemon thread"""
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump(path)
+                except OSError:
+                    pass
+        if self._dump_thread is None:
+            self._dump_thread = threading.Thread(target=loop, name='metrics-dump', daemon=True)
+            self._dump_thread.start()
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve /metrics over HTTP from a daemon thread"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        if self._server is None:
+            self._server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=self._server.serve_forever, name='metrics-http', daemon=True).start()
+        return self._server
+
+    def merge_into_file(self, path):
+        """Add this process's metrics to the JSON state for path and refresh its .prom file.
+
+        One-shot scripts call this on exit so that metrics from many short
+        processes accumulate; an exclusive lock serializes the merges.
+        """
+        path, prom_path = metric_file_paths(path)
+        state = self.snapshot()
+        if not state['counters'] and not state['histograms']:
+            return
+        with open(path, 'a+') as f:
+            try:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            f.seek(0)
+            content = f.read()
+            try:
+                merged = json.loads(content) if content else {}
+            except ValueError:
+                merged = {}
+            if merged.get('buckets', state['buckets']) != state['buckets']:
+                merged = {}
+            merge_state(merged, state)
+            f.seek(0)
+            f.truncate()
+            json.dump(merged, f)
+            f.flush()
+            tmp_path = f'{prom_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'w') as prom:
+                prom.write(render_state(merged))
+            os.replace(tmp_path, prom_path)
+
+
+def metric_file_paths(path):
+    """(JSON state path, .prom path) for INFERENCE_METRICS_FILE.
+
+    The state must never be the .prom file itself, or each merge would
+    overwrite it with text the next run cannot parse.
+    """
+    base, ext = os.path.splitext(path)
+    if ext == '.prom':
+        return base + '.json', path
+    return path, base + '.prom'
+
+
+def model_label(model_path):
+    """Metric label for a model file, e.g. aimodels/heart.pkl -> heart"""
+    return os.path.splitext(os.path.basename(model_path))[0]
+
+
+metrics = Metrics()
+
+if os.environ.get('INFERENCE_METRICS_PORT'):
+    try:
+        metrics.serve(int(os.environ['INFERENCE_METRICS_PORT']))
+    except (OSError, ValueError):
+        pass
+
+if os.environ.get('INFERENCE_METRICS_FILE'):
+    def _merge_on_exit(path=os.environ['INFERENCE_METRICS_FILE']):
+        try:
+            metrics.merge_into_file(path)
+        except OSError:
+            pass
+    atexit.register(_merge_on_exit)
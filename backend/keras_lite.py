@@ -0,0 +1,386 @@
+"""
+TensorFlow-free inference for the small Keras image CNNs.
+
+Reads the architecture and weights of a Keras ``.h5`` file with h5py and
+runs the forward pass with vectorized NumPy (im2col convolutions, pooling,
+dense and activation layers). Only plain ``Sequential`` models built from
+the layers below are supported; anything else raises
+``UnsupportedLayerError``, and load_with_fallback() then loads the model
+with TensorFlow instead.
+"""
+import io
+import json
+import os
+
+import numpy as np
+from numpy.lib.stride_tricks import as_strided
+
+
+class UnsupportedLayerError(ValueError):
+    """Raised when a model uses a layer or option this engine cannot run"""
+
+
+# Activation functions
+def _relu(x):
+    return np.maximum(x, 0)
+
+def _sigmoid(x):
+    # Split on sign to avoid overflow in exp for large negative inputs
+    out = np.empty_like(x)
+    pos = x >= 0
+    out[pos] = 1.0 / (1.0 + np.exp(-x[pos]))
+    ex = np.exp(x[~pos])
+    out[~pos] = ex / (1.0 + ex)
+    return out
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+ACTIVATIONS = {
+    'linear': lambda x: x,
+    None: lambda x: x,
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'softmax': _softmax,
+    'tanh': np.tanh,
+    'elu': lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    'softplus': lambda x: np.logaddexp(x, 0).astype(x.dtype),
+}
+
+
+def _activation(name):
+    if isinstance(name, dict):
+        # Keras 3 may serialize activations as {"class_name": ..., "config": ...}
+        name = name.get('config', {}).get('name', name.get('class_name'))
+    if name not in ACTIVATIONS:
+        raise UnsupportedLayerError(f"Unsupported activation: {name}")
+    return ACTIVATIONS[name]
+
+
+def _pair(value):
+    if isinstance(value, (list, tuple)):
+        return int(value[0]), int(value[1])
+    return int(value), int(value)
+
+
+def _same_padding(size, kernel, stride):
+    """Return (before, after) padding matching TensorFlow's 'same' rule"""
+    out = -(-size // stride)
+    total = max((out - 1) * stride + kernel - size, 0)
+    return total // 2, total - total // 2
+
+
+def _pad(x, kh, kw, sh, sw, padding, value=0.0):
+    if padding == 'valid':
+        return x
+    if padding != 'same':
+        raise UnsupportedLayerError(f"Unsupported padding: {padding}")
+    ph = _same_padding(x.shape[1], kh, sh)
+    pw = _same_padding(x.shape[2], kw, sw)
+    return np.pad(x, ((0, 0), ph, pw, (0, 0)), mode='constant', constant_values=value)
+
+
+def _windows(x, kh, kw, sh, sw):
+    """View an NHWC array as (N, OH, OW, kh, kw, C) sliding windows without copying"""
+    n, h, w, c = x.shape
+    oh = (h - kh) // sh + 1
+    ow = (w - kw) // sw + 1
+    sn, s_h, s_w, sc = x.strides
+    return as_strided(
+        x,
+        shape=(n, oh, ow, kh, kw, c),
+        strides=(sn, s_h * sh, s_w * sw, s_h, s_w, sc),
+        writeable=False,
+    )
+
+
+def _check_channels_last(config):
+    if config.get('data_format', 'channels_last') != 'channels_last':
+        raise UnsupportedLayerError("Only channels_last data_format is supported")
+
+
+# Layer implementations. Each builder takes (config, weights) and returns a
+# function mapping an input batch to an output batch.
+def _build_conv2d(config, weights):
+    _check_channels_last(config)
+    if _pair(config.get('dilation_rate', 1)) != (1, 1):
+        raise UnsupportedLayerError("Dilated convolutions are not supported")
+    if config.get('groups', 1) != 1:
+        raise UnsupportedLayerError("Grouped convolutions are not supported")
+    kernel = weights['kernel']
+    kh, kw, cin, filters = kernel.shape
+    sh, sw = _pair(config.get('strides', 1))
+    padding = config.get('padding', 'valid')
+    flat_kernel = np.ascontiguousarray(kernel.reshape(kh * kw * cin, filters))
+    bias = weights.get('bias') if config.get('use_bias', True) else None
+    act = _activation(config.get('activation'))
+
+    def forward(x):
+        x = _pad(x, kh, kw, sh, sw, padding)
+        cols = _windows(x, kh, kw, sh, sw)
+        n, oh, ow = cols.shape[:3]
+        # im2col: one matrix multiply for the whole batch
+        out = cols.reshape(n * oh * ow, kh * kw * cin) @ flat_kernel
+        if bias is not None:
+            out += bias
+        return act(out.reshape(n, oh, ow, filters))
+    return forward
+
+
+def _build_pool2d(reduce):
+    def build(config, weights):
+        _check_channels_last(config)
+        kh, kw = _pair(config.get('pool_size', 2))
+        strides = config.get('strides')
+        sh, sw = _pair(strides) if strides is not None else (kh, kw)
+        padding = config.get('padding', 'valid')
+
+        def forward(x):
+            if reduce == 'max':
+                x = _pad(x, kh, kw, sh, sw, padding, value=-np.inf)
+                return _windows(x, kh, kw, sh, sw).max(axis=(3, 4))
+            # Average pooling ignores padded cells, as TensorFlow does
+            total = _windows(_pad(x, kh, kw, sh, sw, padding), kh, kw, sh, sw).sum(axis=(3, 4))
+            ones = np.ones((1,) + x.shape[1:3] + (1,), dtype=x.dtype)
+            count = _windows(_pad(ones, kh, kw, sh, sw, padding), kh, kw, sh, sw).sum(axis=(3, 4))
+            return total / count
+        return forward
+    return build
+
+
+def _build_dense(config, weights):
+    kernel = weights['kernel']
+    bias = weights.get('bias') if config.get('use_bias', True) else None
+    act = _activation(config.get('activation'))
+
+    def forward(x):
+        out = x @ kernel
+        if bias is not None:
+            out += bias
+        return act(out)
+    return forward
+
+
+def _batch_norm_axis(config):
+    axis = config.get('axis', -1)
+    if isinstance(axis, list) and len(axis) == 1:
+        axis = axis[0]
+    return axis
+
+
+def _check_batch_norm_axis(config, rank):
+    """Only normalization over the last (channel) axis is supported.
+
+    Checked while loading, with the input rank tracked through the layers,
+    so an unsupported model raises before load_model returns and callers
+    can still fall back to TensorFlow.
+    """
+    axis = _batch_norm_axis(config)
+    if axis == -1 or (rank is not None and axis == rank - 1):
+        return
+    raise UnsupportedLayerError(f"Unsupported BatchNormalization axis {axis} for rank {rank} input")
+
+
+def _build_batch_norm(config, weights):
+    eps = config.get('epsilon', 1e-3)
+    mean = weights['moving_mean']
+    scale = 1.0 / np.sqrt(weights['moving_variance'] + eps)
+    if 'gamma' in weights:
+        scale = scale * weights['gamma']
+    shift = -mean * scale
+    if 'beta' in weights:
+        shift = shift + weights['beta']
+    scale = scale.astype(np.float32)
+    shift = shift.astype(np.float32)
+
+    def forward(x):
+        return x * scale + shift
+    return forward
+
+
+def _build_activation(config, weights):
+    return _activation(config.get('activation'))
+
+
+def _build_relu(config, weights):
+    if config.get('max_value') is not None or config.get('negative_slope', 0) or config.get('threshold', 0):
+        raise UnsupportedLayerError("Only plain ReLU layers are supported")
+    return _relu
+
+
+def _build_softmax(config, weights):
+    if config.get('axis', -1) != -1:
+        raise UnsupportedLayerError("Softmax is only supported on the last axis")
+    return _softmax
+
+
+def _build_flatten(config, weights):
+    _check_channels_last(config)
+    return lambda x: x.reshape(x.shape[0], -1)
+
+
+def _identity(config, weights):
+    return lambda x: x
+
+
+LAYER_BUILDERS = {
+    'InputLayer': None,
+    'Conv2D': _build_conv2d,
+    'MaxPooling2D': _build_pool2d('max'),
+    'AveragePooling2D': _build_pool2d('avg'),
+    'GlobalMaxPooling2D': lambda c, w: lambda x: x.max(axis=(1, 2)),
+    'GlobalAveragePooling2D': lambda c, w: lambda x: x.mean(axis=(1, 2)),
+    'Flatten': _build_flatten,
+    'Dense': _build_dense,
+    'Activation': _build_activation,
+    'ReLU': _build_relu,
+    'Softmax': _build_softmax,
+    'BatchNormalization': _build_batch_norm,
+    'Dropout': _identity,
+    'SpatialDropout2D': _identity,
+    'GaussianNoise': _identity,
+    'GaussianDropout': _identity,
+}
+
+# Layers that change the rank of their input; every other layer keeps it
+OUTPUT_RANK = {
+    'Flatten': 2,
+    'GlobalMaxPooling2D': 2,
+    'GlobalAveragePooling2D': 2,
+}
+
+# Aliases used by older Keras versions
+LAYER_BUILDERS['Convolution2D'] = LAYER_BUILDERS['Conv2D']
+LAYER_BUILDERS['MaxPool2D'] = LAYER_BUILDERS['MaxPooling2D']
+LAYER_BUILDERS['AvgPool2D'] = LAYER_BUILDERS['AveragePooling2D']
+
+
+def _decode(value):
+    return value.decode('utf8') if isinstance(value, bytes) else value
+
+
+def _input_rank(config):
+    """Rank of a layer's declared input (batch axis included), or None"""
+    shape = config.get('batch_input_shape') or config.get('batch_shape')
+    if shape is None:
+        shape = (config.get('build_config') or {}).get('input_shape')
+    return len(shape) if shape else None
+
+
+def _layer_weights(weights_root, layer_name):
+    """Return {short_name: array} for a layer, e.g. {'kernel': ..., 'bias': ...}"""
+    if layer_name not in weights_root:
+        return {}
+    group = weights_root[layer_name]
+    weights = {}
+    for full_name in group.attrs.get('weight_names', []):
+        full_name = _decode(full_name)
+        short = full_name.split('/')[-1].split(':')[0]
+        weights[short] = np.asarray(group[full_name], dtype=np.float32)
+    return weights
+
+
+class LiteModel:
+    """A Sequential Keras model evaluated with NumPy"""
+
+    def __init__(self, layers):
+        # layers: list of (name, class_name, forward)
+        self.layers = layers
+
+    def predict(self, x):
+        out = np.asarray(x, dtype=np.float32)
+        for _, _, forward in self.layers:
+            out = forward(out)
+        return np.asarray(out, dtype=np.float32)
+
+    __call__ = predict
+
+    def summary(self):
+        return [(name, class_name) for name, class_name, _ in self.layers]
+
+
+def load_model(model_path):
+    """Load a Keras .h5 Sequential model into a LiteModel"""
+    import h5py
+
+    with h5py.File(model_path, 'r') as f:
+        if 'model_config' not in f.attrs:
+            raise UnsupportedLayerError(f"{model_path} has no model_config; save the full model, not only weights")
+        model_config = json.loads(_decode(f.attrs['model_config']))
+
+        if model_config.get('class_name') != 'Sequential':
+            raise UnsupportedLayerError(
+                f"Only Sequential models are supported, got {model_config.get('class_name')}"
+            )
+        config = model_config['config']
+        layer_configs = config['layers'] if isinstance(config, dict) else config
+
+        weights_root = f['model_weights'] if 'model_weights' in f else f
+        layers = []
+        rank = None
+        for layer in layer_configs:
+            class_name = layer['class_name']
+            layer_config = layer.get('config', {})
+            name = layer_config.get('name', class_name)
+            if class_name not in LAYER_BUILDERS:
+                raise UnsupportedLayerError(f"Unsupported layer '{name}' of type {class_name}")
+            declared = _input_rank(layer_config) or _input_rank(layer)
+            if declared is not None:
+                rank = declared
+            if class_name == 'BatchNormalization':
+                _check_batch_norm_axis(layer_config, rank)
+            rank = OUTPUT_RANK.get(class_name, rank)
+            builder = LAYER_BUILDERS[class_name]
+            if builder is None:
+                continue
+            weights = _layer_weights(weights_root, name)
+            try:
+                forward = builder(layer_config, weights)
+            except KeyError as e:
+                raise UnsupportedLayerError(f"Layer '{name}' is missing weight {e}")
+            layers.append((name, class_name, forward))
+
+    return LiteModel(layers)
+
+
+class TensorFlowModel:
+    """A Keras model whose predict() doesn't write progress bars to stdout,
+    where the prediction scripts print their JSON reply"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def predict(self, x):
+        return self.model.predict(x, verbose=0)
+
+    __call__ = predict
+
+
+def load_tensorflow_model(model_path):
+    from tensorflow.keras.models import load_model as load_keras_model
+    return TensorFlowModel(load_keras_model(model_path, compile=False))
+
+
+def load_with_fallback(source):
+    """Load a .h5 model (a path or the file's bytes) with this engine, or
+    with TensorFlow when it uses a layer or option this engine can't run"""
+    if isinstance(source, (bytes, bytearray)):
+        data = bytes(source)
+    else:
+        with open(source, 'rb') as f:
+            data = f.read()
+    try:
+        return load_model(io.BytesIO(data))
+    except UnsupportedLayerError:
+        pass
+    # Keras loads from a path; write out the bytes already read so the
+    # model is the same one whose version the caller recorded
+    import tempfile
+    fd, tmp_path = tempfile.mkstemp(suffix='.h5')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return load_tensorflow_model(tmp_path)
+    finally:
+        os.unlink(tmp_path)
@@ -1,12 +1,17 @@
 import sys
 import numpy as np
 import os
-from tensorflow.keras.models import load_model
 from PIL import Image
 import json
+import time
+from image_input import USAGE, valid_args, parse_image_source, image_digest
+from inference_metrics import metrics
+from audit_log import audit, end_response
+from model_files import read_model_file
+from keras_lite import load_with_fallback
 
-def preprocess_image(image_path):
-    img = Image.open(image_path)
+def preprocess_image(image_source):
+    img = Image.open(image_source)
     img = img.resize((36, 36))
     img_array = np.asarray(img) 
     img_array = img_array.reshape((1, 36, 36, 3)) 
@@ -14,21 +19,32 @@ def preprocess_image(image_path):
     return img_array
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(json.dumps({"error": "Usage: python malaria.py <image_path>"}))
+    if not valid_args(sys.argv):
+        print(json.dumps({"error": f"Usage: python malaria.py {USAGE}"}))
         sys.exit(1)
 
-    image_path = sys.argv[1]
-
+    request_start = time.perf_counter()
     try:
         # Get the directory of the current script
         script_dir = os.path.dirname(os.path.abspath(__file__))
         model_path = os.path.join(script_dir, "aimodels", "malaria.h5")
         
-        img_array = preprocess_image(image_path) 
-        model = load_model(model_path) 
-        prediction = model.predict(img_array)[0] 
-        print(json.dumps(prediction.tolist())) 
+        with metrics.time("malaria", "preprocess"):
+            image_source = parse_image_source(sys.argv)
+            img_array = preprocess_image(image_source)
+        with metrics.time("malaria", "load"):
+            model_data, _, model_version = read_model_file(model_path)
+            model = load_with_fallback(model_data)
+        with metrics.time("malaria", "predict"):
+            prediction = model.predict(img_array)[0]
+        with metrics.time("malaria", "serialize"):
+            print(json.dumps(prediction.tolist()))
+        metrics.prediction("malaria")
+        audit.record(
+            "malaria", model_version, image_digest(image_source),
+            prediction.tolist(), time.perf_counter() - request_start
+        )
+        end_response()
     except Exception as e:
         print(json.dumps({"error": str(e)}))
         sys.exit(1)
@@ -0,0 +1,63 @@
+"""
+Model file fingerprints and atomic writes, kept free of heavy imports so
+that scripts which only need a model's version (the CNN scripts) don't
+pull in sklearn.
+"""
+import hashlib
+import os
+import tempfile
+
+
+def file_signature(path):
+    """Cheap change detector: (mtime_ns, size)"""
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def bytes_version(data):
+    """Content version of model bytes, the first 12 hex digits of their sha256"""
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def file_version(path):
+    """Content version of a model file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def read_model_file(path):
+    """(bytes, signature, version) of a model file, all taken from one open.
+
+    Loading and versioning the same bytes means a file replaced mid-request
+    can't be loaded from one copy and reported as another.
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        data = f.read()
+    return data, (st.st_mtime_ns, st.st_size), bytes_version(data)
+
+
+def write_atomic(path, data):
+    """Replace path with data so readers see either the old or the new file, never a partial one"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
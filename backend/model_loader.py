@@ -1,6 +1,7 @@
 """
 Model loader with sklearn compatibility handling
 """
+import io
 import pickle
 import sys
 import warnings
@@ -21,7 +22,7 @@ try:
     import sklearn.utils
     import numpy as np
 except ImportError as e:
-    print(f"Warning: Could not import sklearn modules: {e}")
+    print(f"Warning: Could not import sklearn modules: {e}", file=sys.stderr)
 
 # Create module aliases for old sklearn paths
 def setup_sklearn_aliases():
@@ -54,7 +55,7 @@ def setup_sklearn_aliases():
             sys.modules['sklearn.neighbors.classification'] = neighbors_module
             
     except Exception as e:
-        print(f"Warning: Could not setup sklearn aliases: {e}")
+        print(f"Warning: Could not setup sklearn aliases: {e}", file=sys.stderr)
 
 class SklearnUnpickler(pickle.Unpickler):
     """Custom unpickler to handle sklearn module path changes"""
@@ -122,20 +123,22 @@ class SklearnUnpickler(pickle.Unpickler):
         # Fallback to original method
         return super().find_class(module, name)
 
-def load_model_safely(model_path):
-    """Load a sklearn model with compatibility handling"""
+def load_model_bytes(data):
+    """Load a sklearn model from the bytes of a model file with compatibility handling"""
     setup_sklearn_aliases()
     
     try:
-        with open(model_path, 'rb') as f:
-            unpickler = SklearnUnpickler(f)
-            model = unpickler.load()
-        return model
+        return SklearnUnpickler(io.BytesIO(data)).load()
     except Exception as e:
-        print(f"Error loading with custom unpickler: {e}")
+        # stderr: the prediction scripts reply with JSON on stdout
+        print(f"Error loading with custom unpickler: {e}", file=sys.stderr)
         # Fallback to regular pickle loading
         try:
-            with open(model_path, 'rb') as f:
-                return pickle.load(f)
+            return pickle.loads(data)
         except Exception as e2:
-            raise Exception(f"Failed to load model with both methods. Custom: {e}, Regular: {e2}")
\ No newline at end of file
+            raise Exception(f"Failed to load model with both methods. Custom: {e}, Regular: {e2}")
+
+def load_model_safely(model_path):
+    """Load a sklearn model with compatibility handling"""
+    with open(model_path, 'rb') as f:
+        return load_model_bytes(f.read())
\ No newline at end of file
@@ -0,0 +1,285 @@
+"""
+Resident model registry with hot reload.
+
+Long-running inference processes keep models loaded here. A background
+watcher polls the model files; when one changes it loads the new file,
+validates it against a smoke dataset and swaps it in atomically. Callers
+hold on to the ModelVersion they were given, so requests already in
+flight finish on the old model while new requests get the new one.
+
+The smoke dataset for each model is aimodels/smoke_data.npz (held-out
+rows from synthetic_data, written by write_smoke_data()). A replacement
+must predict the same labels as the resident model on at least
+MIN_AGREEMENT of those rows.
+
+Hot reload needs a resident process that calls registry.start(). The
+prediction scripts are one-shot, so for them get_model() is a plain
+loader that also reports the version of the file it loaded.
+retrain_models.py replaces model files atomically and a model is read
+once, then hashed and loaded from the same bytes, so a script started
+mid-retrain serves either the old or the new model and reports the
+version of the one it actually loaded.
+"""
+import io
+import os
+import threading
+import time
+
+import numpy as np
+
+from inference_metrics import metrics, model_label
+from model_files import file_signature, file_version, read_model_file, write_atomic
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SMOKE_DATA_PATH = os.path.join(script_dir, "aimodels", "smoke_data.npz")
+SMOKE_ROWS = 200
+# Share of smoke rows on which a replacement must agree with the resident model
+MIN_AGREEMENT = 0.9
+
+try:
+    from model_loader import load_model_bytes
+except ImportError:
+    import pickle
+    def load_model_bytes(data):
+        return pickle.loads(data)
+
+
+class ModelValidationError(Exception):
+    """Raised when a reloaded model fails its smoke check"""
+
+
+class ModelVersion:
+    """An immutable loaded model together with the version of the file it came from"""
+
+    __slots__ = ('path', 'model', 'version', 'loaded_at')
+
+    def __init__(self, path, model, version, loaded_at):
+        self.path = path
+        self.model = model
+        self.version = version
+        self.loaded_at = loaded_at
+
+
+def default_loader(path, data):
+    """Load the bytes of a model file: .h5 image models with the NumPy engine
+    (TensorFlow when it can't run them), everything else as a pickle"""
+    if path.endswith('.h5'):
+        from keras_lite import load_with_fallback
+        return load_with_fallback(data)
+    return load_model_bytes(data)
+
+
+def write_smoke_data(path=SMOKE_DATA_PATH, n_rows=SMOKE_ROWS, seed=7):
+    """Save held-out smoke rows for every retrainable model, keyed by model label"""
+    from synthetic_data import SCHEMAS, make_dataset, iter_symptom_chunks
+
+    # A different seed from training so the rows are not the training set
+    arrays = {name: make_dataset(name, n_rows, seed)[0].astype(np.float32) for name in SCHEMAS}
+    arrays['svc'] = next(iter_symptom_chunks(n_rows, seed, chunk_size=n_rows))[0].astype(np.float32)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    write_atomic(path, buffer.getvalue())
+
+
+def load_smoke_data(model_path, path=SMOKE_DATA_PATH):
+    """Smoke rows for a model file, or None when the fixture has none for it"""
+    try:
+        with np.load(path, allow_pickle=False) as smoke:
+            name = model_label(model_path)
+            return smoke[name] if name in smoke.files else None
+    except (OSError, ValueError):
+        return None
+
+
+def _labels(prediction):
+    """Class labels from predict() output; probability rows become their argmax"""
+    prediction = np.asarray(prediction)
+    return prediction.argmax(axis=1) if prediction.ndim == 2 else prediction
+
+
+def validate_model(candidate, current=None, smoke_data=None, min_agreement=MIN_AGREEMENT):
+    """Smoke-test a freshly loaded model before it replaces the current one"""
+    if not hasattr(candidate, 'predict'):
+        raise ModelValidationError("Loaded object has no predict method")
+
+    n_features = getattr(candidate, 'n_features_in_', None)
+    if current is not None:
+        old_features = getattr(current, 'n_features_in_', None)
+        if old_features is not None and n_features is not None and old_features != n_features:
+            raise ModelValidationError(f"Feature count changed from {old_features} to {n_features}")
+        old_classes = getattr(current, 'classes_', None)
+        new_classes = getattr(candidate, 'classes_', None)
+        if old_classes is not None and new_classes is not None and list(old_classes) != list(new_classes):
+            raise ModelValidationError(f"Classes changed from {list(old_classes)} to {list(new_classes)}")
+
+    if smoke_data is None:
+        if n_features is None:
+            return
+        smoke_data = np.zeros((1, n_features), dtype=np.float32)
+    smoke_data = np.asarray(smoke_data)
+
+    try:
+        prediction = np.asarray(candidate.predict(smoke_data))
+    except Exception as e:
+        raise ModelValidationError(f"Prediction on smoke data failed: {e}")
+    if len(prediction) != len(smoke_data):
+        raise ModelValidationError(f"Expected {len(smoke_data)} predictions, got {len(prediction)}")
+    if prediction.dtype.kind == 'f' and not np.all(np.isfinite(prediction)):
+        raise ModelValidationError("Prediction on smoke data is not finite")
+
+    if current is not None:
+        try:
+            reference = np.asarray(current.predict(smoke_data))
+        except Exception:
+            reference = None
+        if reference is not None and reference.shape == prediction.shape:
+            agreement = float(np.mean(_labels(prediction) == _labels(reference)))
+            if agreement < min_agreement:
+                raise ModelValidationError(
+                    f"Agrees with the current model on {agreement:.1%} of smoke data, "
+                    f"{min_agreement:.0%} required"
+                )
+
+    if hasattr(candidate, 'predict_proba'):
+        try:
+            probability = np.asarray(candidate.predict_proba(smoke_data))
+        except AttributeError:
+            # e.g. SVC trained without probability=True
+            return
+        if not np.all(np.isfinite(probability)) or not np.allclose(probability.sum(axis=1), 1.0, atol=1e-3):
+            raise ModelValidationError("Smoke data probabilities are not a valid distribution")
+
+
+class _Entry:
+    __slots__ = ('current', 'signature', 'pending', 'smoke_data', 'last_error')
+
+    def __init__(self, current, signature, smoke_data):
+        self.current = current
+        self.signature = signature
+        # Signature seen on the previous poll but not loaded yet; a file is
+        # only reloaded once it stops changing between two polls
+        self.pending = None
+        self.smoke_data = smoke_data
+        self.last_error = None
+
+
+class ModelRegistry:
+    """Keeps models resident and swaps in new versions when their files change"""
+
+    def __init__(self, interval=2.0, loader=default_loader, validator=validate_model):
+        self.interval = interval
+        self.loader = loader
+        self.validator = validator
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _load(self, path):
+        # One read: the model, its version and its signature all describe the
+        # same bytes even if the file is replaced meanwhile
+        data, signature, version = read_model_file(path)
+        model = self.loader(path, data)
+        return ModelVersion(path, model, version, time.time()), signature
+
+    def register(self, path, smoke_data=None):
+        """Load a model if it is not resident yet and return its current version"""
+        path = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                if smoke_data is not None:
+                    entry.smoke_data = smoke_data
+                return entry.current
+        # Load outside the lock so other models stay available meanwhile
+        loaded, signature = self._load(path)
+        with self._lock:
+            entry = self._entries.setdefault(path, _Entry(loaded, signature, smoke_data))
+            return entry.current
+
+    def get(self, path):
+        """Current version of a model, loading it on first use"""
+        entry = self._entries.get(os.path.abspath(path))
+        if entry is not None:
+            metrics.cache_hit(model_label(path))
+            return entry.current
+        metrics.cache_miss(model_label(path))
+        return self.register(path)
+
+    def check(self):
+        """Poll every registered file once; return the paths that were swapped"""
+        swapped = []
+        with self._lock:
+            items = list(self._entries.items())
+        for path, entry in items:
+            try:
+                signature = file_signature(path)
+            except OSError:
+                # Mid-replace or deleted: keep serving the resident model
+                continue
+            if signature == entry.signature:
+                entry.pending = None
+                continue
+            if signature != entry.pending:
+                entry.pending = signature
+                continue
+            if self._reload(path, entry):
+                swapped.append(path)
+        return swapped
+
+    def _reload(self, path, entry):
+        try:
+            loaded, signature = self._load(path)
+            if entry.smoke_data is None:
+                entry.smoke_data = load_smoke_data(path)
+            self.validator(loaded.model, entry.current.model, entry.smoke_data)
+        except Exception as e:
+            entry.last_error = f"{type(e).__name__}: {e}"
+            metrics.error(model_label(path), "reload")
+            # Don't retry the same broken file on every poll
+            entry.signature = entry.pending
+            entry.pending = None
+            return False
+        with self._lock:
+            entry.current = loaded
+            entry.signature = signature
+            entry.pending = None
+            entry.last_error = None
+        return True
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        """Start the background watcher thread"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="model-registry-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def status(self):
+        """Version and last reload error for every resident model"""
+        with self._lock:
+            return {
+                path: {
+                    "version": entry.current.version,
+                    "loaded_at": entry.current.loaded_at,
+                    "last_error": entry.last_error,
+                }
+                for path, entry in self._entries.items()
+            }
+
+
+# Process-wide registry used by the prediction scripts
+registry = ModelRegistry()
+
+def get_model(path):
+    """Return the resident ModelVersion for a model file"""
+    return registry.get(path)
@@ -1,12 +1,17 @@
 import sys
 import numpy as np
 import os
-from tensorflow.keras.models import load_model
 from PIL import Image
 import json
+import time
+from image_input import USAGE, valid_args, parse_image_source, image_digest
+from inference_metrics import metrics
+from audit_log import audit, end_response
+from model_files import read_model_file
+from keras_lite import load_with_fallback
 
-def preprocess_image(image_path):
-    img = Image.open(image_path).convert('L')  # Open the image and convert to grayscale
+def preprocess_image(image_source):
+    img = Image.open(image_source).convert('L')  # Open the image and convert to grayscale
     img = img.resize((36, 36))  # Resize the image to the desired dimensions
     img_array = np.asarray(img)  # Convert the image to a numpy array
     img_array = img_array.reshape((1, 36, 36, 1))  # Reshape to match model input shape
@@ -14,21 +19,32 @@ def preprocess_image(image_path):
     return img_array
 
 if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print(json.dumps({"error": "Usage: python pneumonia.py <image_path>"}))
+    if not valid_args(sys.argv):
+        print(json.dumps({"error": f"Usage: python pneumonia.py {USAGE}"}))
         sys.exit(1)
 
-    image_path = sys.argv[1]
-
+    request_start = time.perf_counter()
     try:
         # Get the directory of the current script
         script_dir = os.path.dirname(os.path.abspath(__file__))
         model_path = os.path.join(script_dir, "aimodels", "pneumonia.h5")
         
-        img_array = preprocess_image(image_path)  # Preprocess the image
-        model = load_model(model_path)  # Load the trained model
-        prediction = model.predict(img_array)[0]  # Perform prediction
-        print(json.dumps(prediction.tolist()))  # Print the prediction as JSON
+        with metrics.time("pneumonia", "preprocess"):
+            image_source = parse_image_source(sys.argv)
+            img_array = preprocess_image(image_source)  # Preprocess the image
+        with metrics.time("pneumonia", "load"):
+            model_data, _, model_version = read_model_file(model_path)
+            model = load_with_fallback(model_data)  # Load the trained model
+        with metrics.time("pneumonia", "predict"):
+            prediction = model.predict(img_array)[0]  # Perform prediction
+        with metrics.time("pneumonia", "serialize"):
+            print(json.dumps(prediction.tolist()))  # Print the prediction as JSON
+        metrics.prediction("pneumonia")
+        audit.record(
+            "pneumonia", model_version, image_digest(image_source),
+            prediction.tolist(), time.perf_counter() - request_start
+        )
+        end_response()
     except Exception as e:
         print(json.dumps({"error": str(e)}))
         sys.exit(1)
@@ -0,0 +1,250 @@
+"""
+Bitset nearest-neighbour index over HealthPredict/Training.csv.
+
+Training.csv has 4,920 rows but only a few hundred distinct symptom
+patterns. The index keeps each distinct pattern once, packed into a
+132-bit bitset (three uint64 words), together with how many training
+rows of each disease share it. Exact matches are a dict lookup; nearest
+neighbours are a vectorized popcount over all patterns, scored by
+Jaccard similarity (ties broken by Hamming distance).
+
+Usage:
+    python symptom_index.py --query "<comma separated symptoms>" [k]
+    python symptom_index.py --recall [n_queries] [k]
+"""
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from symptom_data import symptoms_dict
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+TRAINING_PATH = os.path.join(script_dir, "HealthPredict", "Training.csv")
+CACHE_PATH = os.path.join(script_dir, "HealthPredict", "Training.bitcache.npz")
+CACHE_FORMAT = 1
+
+WORDS = 3  # 132 symptoms fit in three 64-bit words
+
+if hasattr(np, 'bitwise_count'):
+    def popcount(words):
+        """Set bits per row of a (n, WORDS) uint64 array"""
+        return np.bitwise_count(words).sum(axis=-1, dtype=np.int64)
+else:
+    _BYTE_COUNTS = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+    def popcount(words):
+        """Set bits per row of a (n, WORDS) uint64 array"""
+        as_bytes = np.ascontiguousarray(words).view(np.uint8)
+        return _BYTE_COUNTS[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+def pack_rows(matrix):
+    """Pack an (n, 132) 0/1 matrix into (n, WORDS) uint64 bitsets"""
+    matrix = np.asarray(matrix, dtype=np.uint8)
+    packed = np.packbits(matrix, axis=1)
+    padded = np.zeros((len(matrix), WORDS * 8), dtype=np.uint8)
+    padded[:, :packed.shape[1]] = packed
+    return padded.view(np.uint64)
+
+
+def load_training(path=TRAINING_PATH):
+    """Training.csv as (0/1 uint8 matrix, disease name per row)"""
+    with open(path) as f:
+        next(f)
+        rows = [line.rstrip('\r\n').rsplit(',', 1) for line in f if line.strip()]
+    diseases = np.array([disease for _, disease in rows], dtype=object)
+    # Every cell is a single '0' or '1', so the digits sit at even offsets
+    text = ''.join(bits for bits, _ in rows).encode()
+    width = len(rows[0][0])
+    matrix = np.frombuffer(text, dtype=np.uint8).reshape(len(rows), width)[:, ::2] - ord('0')
+    return matrix, diseases
+
+
+def load_training_cached(path=TRAINING_PATH, cache_path=CACHE_PATH):
+    """load_training(), served from a bit-packed cache while Training.csv is unchanged.
+
+    The cache stores the symptom matrix as packbits rows (17 bytes each) and
+    the diseases as codes into a name table, keyed by the CSV's size and
+    mtime, so later runs skip the CSV parse entirely.
+    """
+    st = os.stat(path)
+    try:
+        with np.load(cache_path, allow_pickle=False) as cache:
+            if (int(cache['format']) == CACHE_FORMAT and int(cache['source_size']) == st.st_size
+                    and int(cache['source_mtime_ns']) == st.st_mtime_ns):
+                n_cols = int(cache['n_cols'])
+                matrix = np.unpackbits(cache['bits'], axis=1, count=n_cols)
+                diseases = cache['names'].astype(object)[cache['codes']]
+                return matrix, diseases
+    except Exception:
+        # Missing, stale-format or damaged (truncated zip, empty file): rebuild
+        pass
+
+    matrix, diseases = load_training(path)
+    names, codes = np.unique(diseases.astype(str), return_inverse=True)
+    try:
+        # Unique temp file per writer so concurrent rebuilds never share one
+        fd, tmp_path = tempfile.mkstemp(suffix='.npz', prefix='.Training.bitcache.',
+                                        dir=os.path.dirname(cache_path))
+    except OSError:
+        # A read-only checkout still works, just without the cache
+        return matrix, diseases
+    try:
+        # mkstemp creates the file 0600; the cache is shared like the CSV
+        os.chmod(tmp_path, 0o644)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(
+                f,
+                format=CACHE_FORMAT,
+                source_size=st.st_size,
+                source_mtime_ns=st.st_mtime_ns,
+                n_cols=matrix.shape[1],
+                bits=np.packbits(matrix, axis=1),
+                names=names,
+                codes=codes.astype(np.uint16),
+            )
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return matrix, diseases
+
+
+class SymptomIndex:
+    """Deduplicated, bit-packed training patterns with per-disease support counts"""
+
+    def __init__(self, matrix, diseases):
+        self.disease_names, disease_ids = np.unique(diseases, return_inverse=True)
+        packed = pack_rows(matrix)
+        keys = packed.view(np.dtype((np.void, WORDS * 8))).ravel()
+        unique_keys, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        self.patterns = packed[first]
+        self.pattern_sizes = popcount(self.patterns)
+        # Rows per (pattern, disease). The table is small (a few hundred
+        # patterns); nearest() works on its nonzero (pattern, disease, rows)
+        # triples sorted by disease, so per-disease maxima are segment
+        # reductions over the pairs that occur rather than over every cell
+        support = np.zeros((len(self.patterns), len(self.disease_names)), dtype=np.int64)
+        np.add.at(support, (inverse.ravel(), disease_ids), 1)
+        pair_disease, pair_pattern = np.nonzero(support.T)
+        self.pair_pattern = pair_pattern
+        self.pair_disease = pair_disease
+        self.pair_rows = support[pair_pattern, pair_disease]
+        self.segments = np.flatnonzero(np.r_[True, pair_disease[1:] != pair_disease[:-1]])
+        self.segment_disease = pair_disease[self.segments]
+        self.segment_of_pair = np.cumsum(np.r_[False, pair_disease[1:] != pair_disease[:-1]])
+        self.support = support
+        self.exact = {key.tobytes(): i for i, key in enumerate(unique_keys)}
+        self.n_rows = len(matrix)
+
+    @classmethod
+    def from_training_csv(cls, path=TRAINING_PATH):
+        return cls(*load_training_cached(path))
+
+    def encode(self, symptoms):
+        """Bitset for a list of symptoms_dict keys"""
+        vector = np.zeros((1, len(symptoms_dict)), dtype=np.uint8)
+        for symptom in symptoms:
+            if symptom in symptoms_dict:
+                vector[0, symptoms_dict[symptom]] = 1
+        return pack_rows(vector)[0]
+
+    def exact_match(self, query):
+        """{disease: support} for a bitset seen verbatim in training, else None"""
+        i = self.exact.get(np.ascontiguousarray(query).tobytes())
+        if i is None:
+            return None
+        counts = self.support[i]
+        return {self.disease_names[d]: int(counts[d]) for d in np.flatnonzero(counts)}
+
+    def nearest(self, query, k=5):
+        """Top-k diseases by best Jaccard similarity to any of their training patterns.
+
+        Support is the number of training rows of that disease whose pattern
+        reaches the disease's best similarity.
+        """
+        query = np.asarray(query, dtype=np.uint64)
+        both = popcount(self.patterns & query)
+        either = self.pattern_sizes + popcount(query[None, :])[0] - both
+        jaccard = np.where(either > 0, both / np.maximum(either, 1), 1.0)
+        hamming = either - both
+
+        # Per disease: the best pattern score, then rows supporting that score
+        score = jaccard[self.pair_pattern]
+        best = np.maximum.reduceat(score, self.segments)
+        segment_of_pair = self.segment_of_pair
+        at_best = score == best[segment_of_pair]
+        support = np.bincount(segment_of_pair[at_best], weights=self.pair_rows[at_best], minlength=len(best))
+        best_hamming = np.minimum.reduceat(
+            np.where(at_best, hamming[self.pair_pattern], np.iinfo(np.int64).max), self.segments
+        )
+
+        order = np.lexsort((-support, best_hamming, -best))[:k]
+        return [
+            {
+                "disease": self.disease_names[self.segment_disease[i]],
+                "similarity": round(float(best[i]), 4),
+                "hamming": int(best_hamming[i]),
+                "support": int(support[i]),
+            }
+            for i in order
+        ]
+
+    def query(self, symptoms, k=5):
+        """Exact-match answer (if any) plus the top-k differential list"""
+        bits = self.encode(symptoms)
+        return {"exact": self.exact_match(bits), "nearest": self.nearest(bits, k)}
+
+
+def measure_recall(index, model, disease_of_label, queries, k=5):
+    """Fraction of queries whose SVC prediction is in the index's top-1 and top-k"""
+    predictions = model.predict(queries)
+    top1 = topk = 0
+    for row, label in zip(queries, predictions):
+        names = [n["disease"] for n in index.nearest(pack_rows(row[None, :])[0], k)]
+        svc_disease = disease_of_label[label]
+        top1 += bool(names) and names[0] == svc_disease
+        topk += svc_disease in names
+    n = len(queries)
+    return {"queries": n, "k": k, "top1_agreement": top1 / n, "topk_recall": topk / n}
+
+
+_index = None
+
+def get_index():
+    """Process-wide index, built on first use"""
+    global _index
+    if _index is None:
+        _index = SymptomIndex.from_training_csv()
+    return _index
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("--query", "--recall"):
+        print(json.dumps({"error": "Usage: python symptom_index.py --query <symptoms> [k] | --recall [n_queries] [k]"}))
+        sys.exit(1)
+
+    try:
+        index = get_index()
+        if sys.argv[1] == "--query":
+            k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+            symptoms = [s.strip() for s in sys.argv[2].split(',')]
+            print(json.dumps(index.query(symptoms, k)))
+        else:
+            from model_loader import load_model_safely
+            from symptom_data import diseases_list
+            from synthetic_data import iter_symptom_chunks
+
+            n_queries = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+            k = int(sys.argv[3]) if len(sys.argv) > 3 else 5
+            model = load_model_safely(os.path.join(script_dir, "aimodels", "svc.pkl"))
+            queries, _ = next(iter_symptom_chunks(n_queries, chunk_size=n_queries))
+            print(json.dumps(measure_recall(index, model, diseases_list, queries, k)))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
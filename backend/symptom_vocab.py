@@ -0,0 +1,299 @@
+"""
+Symptom vocabulary: normalization aliases and prefix/fuzzy autocomplete.
+
+Built from ``symptoms_dict`` and ``HealthPredict/Symptom-severity.csv`` so
+that free-text or oddly spelled symptom names (``spotting urination``,
+``foul_smell_ofurine``, ``Skin Rash``) resolve to the exact keys the SVC
+expects before a prediction is attempted.
+
+Usage:
+    python symptom_vocab.py --suggest <prefix> [limit]
+    python symptom_vocab.py --normalize "<comma separated symptoms>"
+    python symptom_vocab.py --serve
+
+--serve keeps the vocabulary resident for the autocomplete route: it reads
+one JSON query per line ({"q": prefix, "limit": n}) from stdin and writes
+one {"suggestions": [...]} line per query, in order.
+"""
+import csv
+import json
+import os
+import re
+import sys
+
+from symptom_data import symptoms_dict
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+SEVERITY_PATH = os.path.join(script_dir, "HealthPredict", "Symptom-severity.csv")
+
+# Common spellings that differ from the training column names
+EXTRA_ALIASES = {
+    'diarrhea': 'diarrhoea',
+    'swollen_extremities': 'swollen_extremeties',
+    'cold_hands_and_feet': 'cold_hands_and_feets',
+    'scarring': 'scurring',
+    'toxic_look': 'toxic_look_(typhos)',
+    'typhos': 'toxic_look_(typhos)',
+    'rash': 'skin_rash',
+    'shortness_of_breath': 'breathlessness',
+    'stomach_ache': 'stomach_pain',
+    'tiredness': 'fatigue',
+}
+
+
+def canonical(name):
+    """Lowercase and collapse spaces, hyphens and repeated underscores to '_'"""
+    name = re.sub(r'[\s\-_]+', '_', str(name).strip().lower())
+    return name.strip('_')
+
+
+def squash(name):
+    """Drop everything but letters and digits, e.g. 'foul_smell_of urine' -> 'foulsmellofurine'"""
+    return re.sub(r'[^a-z0-9]', '', str(name).lower())
+
+
+def label(key):
+    """Human readable form of a symptom key"""
+    return re.sub(r'\.\d+$', '', canonical(key)).replace('_', ' ')
+
+
+def load_severity(path=SEVERITY_PATH):
+    """Read Symptom-severity.csv into {name: weight}, keeping the first weight of duplicates"""
+    weights = {}
+    try:
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                name = row.get('Symptom', '').strip()
+                if name and name != 'prognosis' and name not in weights:
+                    weights[name] = int(row['weight'])
+    except (OSError, ValueError, KeyError):
+        pass
+    return weights
+
+
+class _TrieNode:
+    __slots__ = ('children', 'ranked')
+
+    def __init__(self):
+        self.children = {}
+        # Ranked (kind, length, id) entries for every term in this subtree
+        self.ranked = []
+
+
+class SymptomVocabulary:
+    """Alias map plus a trie over symptom names for ranked autocomplete"""
+
+    # Match kinds, lower ranks first: name starts with the query, a later
+    # word of the name starts with it, an alias starts with it
+    NAME, WORD, ALIAS = 0, 1, 2
+
+    def __init__(self, symptoms=None, severity=None, aliases=None):
+        symptoms = symptoms_dict if symptoms is None else symptoms
+        severity = load_severity() if severity is None else severity
+        aliases = EXTRA_ALIASES if aliases is None else aliases
+
+        self.keys = sorted(symptoms, key=symptoms.get)
+        self.labels = [label(k) for k in self.keys]
+        self.key_ids = {k: i for i, k in enumerate(self.keys)}
+        by_squash = {}
+        for i, key in enumerate(self.keys):
+            by_squash.setdefault(squash(key), i)
+            by_squash.setdefault(squash(label(key)), i)
+
+        # Alias map: any canonical or squashed spelling -> symptom id
+        self.alias_map = {}
+        for i, key in enumerate(self.keys):
+            self.alias_map[key] = i
+            self.alias_map.setdefault(canonical(key), i)
+            self.alias_map.setdefault(canonical(label(key)), i)
+        self.weights = [0] * len(self.keys)
+        for name, weight in severity.items():
+            i = by_squash.get(squash(name))
+            if i is not None:
+                self.alias_map.setdefault(canonical(name), i)
+                if not self.weights[i]:
+                    self.weights[i] = weight
+        for alias, key in aliases.items():
+            i = by_squash.get(squash(key))
+            if i is not None:
+                self.alias_map.setdefault(canonical(alias), i)
+        self.squash_map = {squash(a): i for a, i in self.alias_map.items()}
+        self.squash_map.update(by_squash)
+
+        self.root = _TrieNode()
+        indexed = set()
+        for i, name in enumerate(self.labels):
+            # 'fluid_overload.1' duplicates 'fluid_overload'; suggest it once
+            if name in indexed:
+                continue
+            indexed.add(name)
+            words = name.split(' ')
+            self._insert(' '.join(words), (self.NAME, len(name), i))
+            for w in range(1, len(words)):
+                self._insert(' '.join(words[w:]), (self.WORD, len(name), i))
+        for alias, i in self.alias_map.items():
+            alias = label(alias)
+            if alias != self.labels[i]:
+                self._insert(alias, (self.ALIAS, len(self.labels[i]), i))
+        self._finalize(self.root)
+
+    def _insert(self, term, entry):
+        node = self.root
+        node.ranked.append(entry)
+        for ch in term:
+            node = node.children.setdefault(ch, _TrieNode())
+            node.ranked.append(entry)
+
+    def _finalize(self, node):
+        # Sort once at build time and keep only the best entry per symptom,
+        # so a prefix lookup is a walk plus a slice
+        seen = set()
+        ranked = []
+        for entry in sorted(node.ranked):
+            if entry[2] not in seen:
+                seen.add(entry[2])
+                ranked.append(entry)
+        node.ranked = ranked
+        for child in node.children.values():
+            self._finalize(child)
+
+    def normalize(self, name):
+        """Return the symptoms_dict key for an exact, alias or squashed spelling, else None.
+
+        Near misses are deliberately not resolved here: a close spelling can
+        be a different symptom ('swelling' vs 'sweating'), so they are left
+        for the user to confirm from suggest().
+        """
+        if name in self.key_ids:
+            return name
+        i = self.alias_map.get(canonical(name))
+        if i is None:
+            i = self.squash_map.get(squash(name))
+        return self.keys[i] if i is not None else None
+
+    def normalize_all(self, names, limit=5):
+        """Normalize a list of names.
+
+        Returns (recognized keys, unrecognized), where each unrecognized
+        entry is {"symptom": name, "suggestions": suggest(name, limit)}.
+        """
+        recognized, unrecognized = [], []
+        for name in names:
+            if not str(name).strip():
+                continue
+            key = self.normalize(name)
+            if key is None:
+                unrecognized.append({"symptom": name, "suggestions": self.suggest(name, limit)})
+            elif key not in recognized:
+                recognized.append(key)
+        return recognized, unrecognized
+
+    def suggest(self, prefix, limit=10, max_distance=None):
+        """Ranked suggestions for a partially typed symptom name"""
+        query = label(prefix)
+        if not query:
+            return []
+        node = self.root
+        for ch in query:
+            node = node.children.get(ch)
+            if node is None:
+                break
+        results = [(0,) + entry for entry in node.ranked[:limit]] if node is not None else []
+
+        # Only fall back to fuzzy matching when the prefix matches nothing,
+        # which keeps the common keystroke a trie walk plus a slice
+        if not results:
+            if max_distance is None:
+                max_distance = self._default_distance(query)
+            if max_distance:
+                fuzzy = {}
+                self._fuzzy_prefix(query, max_distance, fuzzy)
+                results = sorted((d,) + entry for d, entry in fuzzy.values())[:limit]
+
+        return [
+            {
+                "symptom": self.keys[i],
+                "label": self.labels[i],
+                "weight": self.weights[i],
+                "distance": d,
+            }
+            for d, _, _, i in results
+        ]
+
+    def _fuzzy_prefix(self, query, max_distance, found):
+        """Collect {id: (distance, entry)} for terms with a prefix within max_distance of query.
+
+        The first character is taken as typed; anchoring the search there
+        keeps the Levenshtein walk to a small part of the trie.
+        """
+        start = self.root.children.get(query[0])
+        if start is None:
+            return
+        first_row = list(range(len(query) + 1))
+        stack = [(start, query[0], first_row)]
+        while stack:
+            node, ch, prev = stack.pop()
+            row = [prev[0] + 1]
+            for j, qc in enumerate(query, 1):
+                row.append(min(prev[j] + 1, row[j - 1] + 1, prev[j - 1] + (qc != ch)))
+            if row[-1] <= max_distance:
+                # Everything below this node extends a matching prefix
+                for entry in node.ranked:
+                    current = found.get(entry[2])
+                    if current is None or (row[-1], entry) < current:
+                        found[entry[2]] = (row[-1], entry)
+                continue
+            if min(row) <= max_distance:
+                stack.extend((child, c, row) for c, child in node.children.items())
+
+    @staticmethod
+    def _default_distance(query):
+        if len(query) < 4:
+            return 0
+        return 1 if len(query) < 8 else 2
+
+
+_vocabulary = None
+
+def get_vocabulary():
+    """Process-wide vocabulary, built on first use"""
+    global _vocabulary
+    if _vocabulary is None:
+        _vocabulary = SymptomVocabulary()
+    return _vocabulary
+
+
+def serve(lines=sys.stdin, out=sys.stdout):
+    """Answer one suggestion query per input line until stdin closes"""
+    vocabulary = get_vocabulary()
+    for line in lines:
+        try:
+            query = json.loads(line)
+            limit = min(int(query.get('limit') or 10), 50)
+            reply = {"suggestions": vocabulary.suggest(str(query.get('q', '')), limit)}
+        except (ValueError, TypeError, AttributeError) as e:
+            reply = {"error": str(e)}
+        out.write(json.dumps(reply) + '\n')
+        out.flush()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["--serve"]:
+        serve()
+        sys.exit(0)
+    if len(sys.argv) < 3 or sys.argv[1] not in ("--suggest", "--normalize"):
+        print(json.dumps({"error": "Usage: python symptom_vocab.py --suggest <prefix> [limit] | --normalize <symptoms> | --serve"}))
+        sys.exit(1)
+
+    try:
+        vocabulary = get_vocabulary()
+        if sys.argv[1] == "--suggest":
+            limit = int(sys.argv[3]) if len(sys.argv) > 3 else 10
+            print(json.dumps({"suggestions": vocabulary.suggest(sys.argv[2], limit)}))
+        else:
+            names = [s.strip() for s in sys.argv[2].split(',')]
+            recognized, unrecognized = vocabulary.normalize_all(names)
+            print(json.dumps({"symptoms": recognized, "unrecognized": unrecognized}))
+    except Exception as e:
+        print(json.dumps({"error": str(e)}))
+        sys.exit(1)
@@ -4,11 +4,19 @@ import pandas as pd
 import pickle
 import json
 import os
+import time
+
+from symptom_data import symptoms_dict, diseases_list
+from symptom_vocab import get_vocabulary
+from inference_metrics import metrics
+from symptom_index import get_index
+from drift_monitor import drift
+from audit_log import audit, end_response
+
+request_start = time.perf_counter()
 
 # print("Python version:", sys.version)
 # print("Python executable path:", sys.executable)
-symptoms_dict = {'itching': 0, 'skin_rash': 1, 'nodal_skin_eruptions': 2, 'continuous_sneezing': 3, 'shivering': 4, 'chills': 5, 'joint_pain': 6, 'stomach_pain': 7, 'acidity': 8, 'ulcers_on_tongue': 9, 'muscle_wasting': 10, 'vomiting': 11, 'burning_micturition': 12, 'spotting_ urination': 13, 'fatigue': 14, 'weight_gain': 15, 'anxiety': 16, 'cold_hands_and_feets': 17, 'mood_swings': 18, 'weight_loss': 19, 'restlessness': 20, 'lethargy': 21, 'patches_in_throat': 22, 'irregular_sugar_level': 23, 'cough': 24, 'high_fever': 25, 'sunken_eyes': 26, 'breathlessness': 27, 'sweating': 28, 'dehydration': 29, 'indigestion': 30, 'headache': 31, 'yellowish_skin': 32, 'dark_urine': 33, 'nausea': 34, 'loss_of_appetite': 35, 'pain_behind_the_eyes': 36, 'back_pain': 37, 'constipation': 38, 'abdominal_pain': 39, 'diarrhoea': 40, 'mild_fever': 41, 'yellow_urine': 42, 'yellowing_of_eyes': 43, 'acute_liver_failure': 44, 'fluid_overload': 45, 'swelling_of_stomach': 46, 'swelled_lymph_nodes': 47, 'malaise': 48, 'blurred_and_distorted_vision': 49, 'phlegm': 50, 'throat_irritation': 51, 'redness_of_eyes': 52, 'sinus_pressure': 53, 'runny_nose': 54, 'congestion': 55, 'chest_pain': 56, 'weakness_in_limbs': 57, 'fast_heart_rate': 58, 'pain_during_bowel_movements': 59, 'pain_in_anal_region': 60, 'bloody_stool': 61, 'irritation_in_anus': 62, 'neck_pain': 63, 'dizziness': 64, 'cramps': 65, 'bruising': 66, 'obesity': 67, 'swollen_legs': 68, 'swollen_blood_vessels': 69, 'puffy_face_and_eyes': 70, 'enlarged_thyroid': 71, 'brittle_nails': 72, 'swollen_extremeties': 73, 'excessive_hunger': 74, 'extra_marital_contacts': 75, 'drying_and_tingling_lips': 76, 'slurred_speech': 77, 'knee_pain': 78, 'hip_joint_pain': 79, 'muscle_weakness': 80, 'stiff_neck': 81, 'swelling_joints': 82, 'movement_stiffness': 83, 'spinning_movements': 84, 'loss_of_balance': 85, 'unsteadiness': 86, 'weakness_of_one_body_side': 87, 'loss_of_smell': 88, 'bladder_discomfort': 89, 'foul_smell_of urine': 90, 'continuous_feel_of_urine': 91, 'passage_of_gases': 92, 'internal_itching': 93, 'toxic_look_(typhos)': 94, 'depression': 95, 'irritability': 96, 'muscle_pain': 97, 'altered_sensorium': 98, 'red_spots_over_body': 99, 'belly_pain': 100, 'abnormal_menstruation': 101, 'dischromic _patches': 102, 'watering_from_eyes': 103, 'increased_appetite': 104, 'polyuria': 105, 'family_history': 106, 'mucoid_sputum': 107, 'rusty_sputum': 108, 'lack_of_concentration': 109, 'visual_disturbances': 110, 'receiving_blood_transfusion': 111, 'receiving_unsterile_injections': 112, 'coma': 113, 'stomach_bleeding': 114, 'distention_of_abdomen': 115, 'history_of_alcohol_consumption': 116, 'fluid_overload.1': 117, 'blood_in_sputum': 118, 'prominent_veins_on_calf': 119, 'palpitations': 120, 'painful_walking': 121, 'pus_filled_pimples': 122, 'blackheads': 123, 'scurring': 124, 'skin_peeling': 125, 'silver_like_dusting': 126, 'small_dents_in_nails': 127, 'inflammatory_nails': 128, 'blister': 129, 'red_sore_around_nose': 130, 'yellow_crust_ooze': 131}
-diseases_list = {15: 'Fungal infection', 4: 'Allergy', 16: 'GERD', 9: 'Chronic cholestasis', 14: 'Drug Reaction', 33: 'Peptic ulcer diseae', 1: 'AIDS', 12: 'Diabetes ', 17: 'Gastroenteritis', 6: 'Bronchial Asthma', 23: 'Hypertension ', 30: 'Migraine', 7: 'Cervical spondylosis', 32: 'Paralysis (brain hemorrhage)', 28: 'Jaundice', 29: 'Malaria', 8: 'Chicken pox', 11: 'Dengue', 37: 'Typhoid', 40: 'hepatitis A', 19: 'Hepatitis B', 20: 'Hepatitis C', 21: 'Hepatitis D', 22: 'Hepatitis E', 3: 'Alcoholic hepatitis', 36: 'Tuberculosis', 10: 'Common Cold', 34: 'Pneumonia', 13: 'Dimorphic hemmorhoids(piles)', 18: 'Heart attack', 39: 'Varicose veins', 26: 'Hypothyroidism', 24: 'Hyperthyroidism', 25: 'Hypoglycemia', 31: 'Osteoarthristis', 5: 'Arthritis', 0: '(vertigo) Paroymsal  Positional Vertigo', 2: 'Acne', 38: 'Urinary tract infection', 35: 'Psoriasis', 27: 'Impetigo'}
 
 # Get the directory of the current script
 script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,9 +34,12 @@ model_path = os.path.join(script_dir, "aimodels", "svc.pkl")
 try:
     # Try to import the safe model loader
     sys.path.append(script_dir)
-    from model_loader import load_model_safely
-    model = load_model_safely(model_path)
+    from model_registry import get_model
+    with metrics.time("svc", "load"):
+        model_version = get_model(model_path)
+    model = model_version.model
 except ImportError:
+    model_version = None
     # Fallback to regular pickle loading with warnings suppressed
     import warnings
     warnings.filterwarnings('ignore')
@@ -74,8 +85,14 @@ try:
     else:
         symptoms = symptoms_string
     
-    predicted_disease = get_predicted_value(symptoms)
+    # Map free-text spellings onto the exact keys the model was trained on
+    symptoms, unrecognized_symptoms = get_vocabulary().normalize_all(symptoms)
+    drift.observe_symptoms(symptoms)
+
+    with metrics.time("svc", "predict"):
+        predicted_disease = get_predicted_value(symptoms)
     dis_des, precautions, medications, rec_diet, workout = helper(predicted_disease)
+    differential = get_index().nearest(get_index().encode(symptoms), 5)
 
     my_precautions = []
     for i in precautions[0]:
@@ -87,11 +104,21 @@ try:
         "my_precautions": str(my_precautions),
         "medications": str(medications),
         "rec_diet": str(rec_diet),
-        "workout": str(workout) 
+        "workout": str(workout),
+        "unrecognized_symptoms": unrecognized_symptoms,
+        "differential_diagnosis": differential,
+        "model_version": model_version.version if model_version else None
     }
     
     # Print only the JSON result (no extra print statements)
-    print(json.dumps(result_data))
+    with metrics.time("svc", "serialize"):
+        print(json.dumps(result_data))
+    metrics.prediction("svc")
+    audit.record(
+        "svc", result_data["model_version"], {"data": symptoms_string, "symptoms": symptoms},
+        result_data, time.perf_counter() - request_start
+    )
+    end_response()
     
 except Exception as e:
     print(json.dumps({"error": f"Error processing symptoms: {str(e)}"}))
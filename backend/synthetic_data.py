@@ -0,0 +1,378 @@
+"""
+Seedable synthetic patient generator for training and load testing.
+
+Each tabular disease has a schema: feature distributions plus the risk
+rule that produces the label. Rows are generated in vectorized chunks,
+each chunk from its own deterministic stream, so any row count can be
+produced (or streamed to CSV/NPY) in constant memory. Chunk 0 of a seed
+reproduces exactly the data retrain_models.py has always trained on.
+
+Also generates symptom sets (perturbed Training.csv profiles) and
+synthetic 36x36 images for the pneumonia/malaria CNN paths.
+
+Usage:
+    python synthetic_data.py <diabetes|heart|kidney|liver|breast_cancer|symptoms> <rows> <out.csv|out.npy> [--seed N] [--chunk-size N]
+    python synthetic_data.py <pneumonia|malaria> <count> <out_dir> [--seed N]
+"""
+import argparse
+import os
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+_BREAST_CANCER_BASES = [
+    'radius', 'texture', 'perimeter', 'area', 'smoothness',
+    'compactness', 'concavity', 'concave_points', 'symmetry', 'fractal_dimension',
+]
+
+# Feature order matches the column order the models are trained on. Each
+# feature is (name, distribution, a, b) drawn as np.random.<distribution>(a, b).
+# Risk terms are (feature, op, value, weight); the label is 1 when the sum
+# of matching weights plus N(0, noise) exceeds the threshold.
+SCHEMAS = {
+    'diabetes': {
+        'features': [
+            ('pregnancies', 'randint', 0, 18),
+            ('glucose', 'normal', 120, 30),
+            ('blood_pressure', 'normal', 70, 12),
+            ('skin_thickness', 'normal', 20, 8),
+            ('insulin', 'normal', 80, 40),
+            ('bmi', 'normal', 32, 8),
+            ('diabetes_pedigree', 'uniform', 0.078, 2.42),
+            ('age', 'randint', 21, 81),
+        ],
+        'risk': [
+            ('glucose', '>', 140, 0.3),
+            ('bmi', '>', 30, 0.2),
+            ('age', '>', 45, 0.15),
+            ('pregnancies', '>', 5, 0.1),
+            ('blood_pressure', '>', 80, 0.1),
+            ('diabetes_pedigree', '>', 0.5, 0.15),
+        ],
+        'noise': 0.1,
+        'threshold': 0.5,
+    },
+    'heart': {
+        'features': [
+            ('age', 'randint', 29, 78),
+            ('sex', 'randint', 0, 2),
+            ('cp', 'randint', 0, 4),  # chest pain type
+            ('trestbps', 'normal', 130, 17),  # resting blood pressure
+            ('chol', 'normal', 246, 51),  # cholesterol
+            ('fbs', 'randint', 0, 2),  # fasting blood sugar
+            ('restecg', 'randint', 0, 3),  # resting ECG
+            ('thalach', 'normal', 150, 22),  # max heart rate
+            ('exang', 'randint', 0, 2),  # exercise induced angina
+            ('oldpeak', 'uniform', 0, 6.2),  # ST depression
+            ('slope', 'randint', 0, 3),
+            ('ca', 'randint', 0, 4),  # number of major vessels
+            ('thal', 'randint', 0, 4),
+        ],
+        'risk': [
+            ('age', '>', 55, 0.2),
+            ('sex', '==', 1, 0.15),  # male
+            ('cp', '==', 0, 0.2),  # asymptomatic chest pain
+            ('trestbps', '>', 140, 0.1),
+            ('chol', '>', 240, 0.1),
+            ('thalach', '<', 150, 0.1),
+            ('exang', '==', 1, 0.15),
+        ],
+        'noise': 0.1,
+        'threshold': 0.4,
+    },
+    'kidney': {
+        'features': [
+            ('age', 'randint', 20, 90),
+            ('bp', 'normal', 80, 15),  # blood pressure
+            ('sg', 'uniform', 1.005, 1.025),  # specific gravity
+            ('al', 'randint', 0, 6),  # albumin
+            ('su', 'randint', 0, 6),  # sugar
+            ('rbc', 'randint', 0, 2),  # red blood cells
+            ('pc', 'randint', 0, 2),  # pus cell
+        ],
+        'risk': [
+            ('age', '>', 60, 0.2),
+            ('bp', '>', 90, 0.3),
+            ('al', '>', 2, 0.25),
+            ('su', '>', 0, 0.15),
+            ('rbc', '==', 1, 0.1),
+        ],
+        'noise': 0.1,
+        'threshold': 0.4,
+    },
+    'liver': {
+        'features': [
+            ('age', 'randint', 10, 90),
+            ('gender', 'randint', 0, 2),
+            ('total_bilirubin', 'uniform', 0.1, 75),
+            ('direct_bilirubin', 'uniform', 0.1, 19.7),
+            ('alkaline_phosphotase', 'uniform', 63, 2110),
+            ('alamine_aminotransferase', 'uniform', 10, 2000),
+            ('aspartate_aminotransferase', 'uniform', 10, 4929),
+            ('total_proteins', 'uniform', 2.7, 9.6),
+            ('albumin', 'uniform', 0.9, 5.5),
+            ('albumin_globulin_ratio', 'uniform', 0.3, 2.8),
+        ],
+        'risk': [
+            ('total_bilirubin', '>', 10, 0.2),
+            ('alkaline_phosphotase', '>', 200, 0.15),
+            ('alamine_aminotransferase', '>', 56, 0.2),
+            ('aspartate_aminotransferase', '>', 40, 0.2),
+            ('albumin', '<', 3.5, 0.15),
+            ('age', '>', 50, 0.1),
+        ],
+        'noise': 0.1,
+        'threshold': 0.4,
+    },
+    'breast_cancer': {
+        # 30 features like the Wisconsin dataset: means, standard errors, worst values
+        'features': (
+            [(f'{b}_mean', 'normal', 14, 4) for b in _BREAST_CANCER_BASES] +
+            [(f'{b}_se', 'normal', 1, 0.5) for b in _BREAST_CANCER_BASES] +
+            [(f'{b}_worst', 'normal', 16, 5) for b in _BREAST_CANCER_BASES]
+        ),
+        'risk': [
+            ('radius_mean', '>', 15, 0.3),
+            ('perimeter_mean', '>', 100, 0.2),
+            ('compactness_mean', '>', 0.1, 0.2),
+            ('radius_worst', '>', 20, 0.3),
+        ],
+        'noise': 0.1,
+        'threshold': 0.4,
+    },
+}
+
+_OPS = {
+    '>': np.greater,
+    '<': np.less,
+    '==': np.equal,
+}
+
+
+def feature_names(name):
+    return [feature[0] for feature in SCHEMAS[name]['features']]
+
+
+def _chunk_state(seed, chunk_index):
+    # Chunk 0 uses the bare seed so it matches np.random.seed(seed) streams
+    if chunk_index == 0:
+        return np.random.RandomState(seed)
+    return np.random.RandomState([seed, chunk_index])
+
+
+def generate_chunk(name, n_rows, seed=42, chunk_index=0):
+    """Generate one chunk of (X, y) for a disease schema"""
+    schema = SCHEMAS[name]
+    rng = _chunk_state(seed, chunk_index)
+    columns = [getattr(rng, dist)(a, b, n_rows) for _, dist, a, b in schema['features']]
+    index = {feature[0]: i for i, feature in enumerate(schema['features'])}
+
+    risk_score = np.zeros(n_rows)
+    for feature, op, value, weight in schema['risk']:
+        risk_score += _OPS[op](columns[index[feature]], value) * weight
+    risk_score += rng.normal(0, schema['noise'], n_rows)
+    target = (risk_score > schema['threshold']).astype(int)
+
+    return np.column_stack(columns), target
+
+
+def make_dataset(name, n_samples=1000, seed=42):
+    """Single-chunk dataset, identical to the original retrain_models.py data"""
+    return generate_chunk(name, n_samples, seed)
+
+
+def iter_chunks(name, n_rows, seed=42, chunk_size=100000):
+    """Yield (X, y) chunks totalling n_rows"""
+    for chunk_index, start in enumerate(range(0, n_rows, chunk_size)):
+        yield generate_chunk(name, min(chunk_size, n_rows - start), seed, chunk_index)
+
+
+def write_npy(name, path, n_rows, seed=42, chunk_size=100000):
+    """Stream n_rows into a memory-mapped .npy file; the label is the last column"""
+    n_cols = len(SCHEMAS[name]['features']) + 1
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.float64, shape=(n_rows, n_cols))
+    start = 0
+    for X, y in iter_chunks(name, n_rows, seed, chunk_size):
+        out[start:start + len(X), :-1] = X
+        out[start:start + len(X), -1] = y
+        start += len(X)
+    out.flush()
+    del out
+
+
+def write_csv(name, path, n_rows, seed=42, chunk_size=100000):
+    """Stream n_rows to CSV with a header row; the label column is 'target'"""
+    import pandas as pd
+
+    columns = feature_names(name) + ['target']
+    with open(path, 'w', newline='') as f:
+        for i, (X, y) in enumerate(iter_chunks(name, n_rows, seed, chunk_size)):
+            frame = pd.DataFrame(np.column_stack([X, y]), columns=columns)
+            frame.to_csv(f, header=(i == 0), index=False, float_format='%.6g')
+
+
+# Symptom sets
+def load_symptom_profiles(path=None):
+    """Training.csv as (binary matrix, disease names)"""
+    import pandas as pd
+
+    path = path or os.path.join(script_dir, "HealthPredict", "Training.csv")
+    frame = pd.read_csv(path)
+    return frame.iloc[:, :-1].to_numpy(dtype=np.uint8), frame.iloc[:, -1].to_numpy()
+
+
+def generate_symptom_chunk(profiles, diseases, n_rows, seed=42, chunk_index=0, drop_rate=0.1, extra_rate=0.005):
+    """Sample Training.csv rows, drop some present symptoms and add a few stray ones"""
+    rng = _chunk_state(seed, chunk_index)
+    rows = rng.randint(0, len(profiles), n_rows)
+    X = profiles[rows]
+    keep = rng.random_sample(X.shape) >= drop_rate
+    extra = rng.random_sample(X.shape) < extra_rate
+    X = ((X.astype(bool) & keep) | extra).astype(np.uint8)
+    return X, diseases[rows]
+
+
+def iter_symptom_chunks(n_rows, seed=42, chunk_size=100000, profiles=None):
+    if profiles is None:
+        profiles = load_symptom_profiles()
+    matrix, diseases = profiles
+    for chunk_index, start in enumerate(range(0, n_rows, chunk_size)):
+        yield generate_symptom_chunk(matrix, diseases, min(chunk_size, n_rows - start), seed, chunk_index)
+
+
+def symptom_strings(X):
+    """Comma-separated symptom names per row, the input format of symptoms.py"""
+    from symptom_data import symptoms_dict
+
+    names = np.array(sorted(symptoms_dict, key=symptoms_dict.get), dtype=object)
+    return [','.join(names[row.astype(bool)]) for row in X]
+
+
+def symptom_matrix(strings):
+    """Inverse of symptom_strings(): binary symptom vectors from comma-separated names"""
+    from symptom_data import symptoms_dict
+
+    X = np.zeros((len(strings), len(symptoms_dict)), dtype=np.uint8)
+    for i, text in enumerate(strings):
+        if not isinstance(text, str):
+            continue
+        for name in text.split(','):
+            index = symptoms_dict.get(name.strip())
+            if index is not None:
+                X[i, index] = 1
+    return X
+
+
+def write_symptom_npy(path, n_rows, seed=42, chunk_size=100000):
+    """Stream binary symptom vectors into a memory-mapped uint8 .npy file"""
+    profiles = load_symptom_profiles()
+    out = np.lib.format.open_memmap(path, mode='w+', dtype=np.uint8, shape=(n_rows, profiles[0].shape[1]))
+    start = 0
+    for X, _ in iter_symptom_chunks(n_rows, seed, chunk_size, profiles):
+        out[start:start + len(X)] = X
+        start += len(X)
+    out.flush()
+    del out
+
+
+def write_symptom_csv(path, n_rows, seed=42, chunk_size=100000):
+    """Stream (symptoms, disease) rows to CSV in the symptoms.py input format"""
+    import csv
+
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(['symptoms', 'disease'])
+        for X, diseases in iter_symptom_chunks(n_rows, seed, chunk_size):
+            writer.writerows(zip(symptom_strings(X), diseases))
+
+
+# Images
+IMAGE_CHANNELS = {'pneumonia': 1, 'malaria': 3}
+# Generating a malaria image peaks at ~95 KB of float64 temporaries, so
+# image chunks are far smaller than tabular ones (~190 MB per chunk)
+IMAGE_CHUNK_SIZE = 2000
+
+
+def generate_images(kind, n_images, seed=42, chunk_index=0, size=36):
+    """Synthetic uint8 images shaped (n, size, size, channels) with a 0/1 label per image.
+
+    Pneumonia images are smooth grayscale fields with a bright opacity for
+    positive labels; malaria images are pale cells with dark stained spots
+    for positive labels. They exercise the preprocessing and CNN paths and
+    are not meant to be diagnostically realistic.
+    """
+    channels = IMAGE_CHANNELS[kind]
+    rng = _chunk_state(seed, chunk_index)
+    labels = rng.randint(0, 2, n_images)
+    yy, xx = np.mgrid[0:size, 0:size] / (size - 1.0)
+
+    # Low-frequency background: a coarse noise grid upsampled by repetition
+    coarse = rng.random_sample((n_images, 6, 6))
+    background = np.kron(coarse, np.ones((size // 6 + 1, size // 6 + 1)))[:, :size, :size]
+
+    cy, cx = rng.random_sample((2, n_images, 1, 1)) * 0.6 + 0.2
+    radius = rng.random_sample((n_images, 1, 1)) * 0.15 + 0.1
+    spot = np.exp(-((yy - cy) ** 2 + (xx - cx) ** 2) / (2 * radius ** 2))
+    sign = 1.0 if kind == 'pneumonia' else -1.0
+    image = 0.4 + 0.3 * background + sign * 0.5 * spot * labels[:, None, None]
+    image += rng.normal(0, 0.03, image.shape)
+    image = np.clip(image, 0, 1)
+
+    if channels == 3:
+        # Pink stain tint
+        tint = np.array([0.95, 0.7, 0.8])
+        image = image[..., None] * tint
+    else:
+        image = image[..., None]
+    return (image * 255).astype(np.uint8), labels
+
+
+def iter_images(kind, n_images, seed=42, chunk_size=IMAGE_CHUNK_SIZE):
+    """Yield (images, labels) chunks covering n_images"""
+    for chunk_index, start in enumerate(range(0, n_images, chunk_size)):
+        yield generate_images(kind, min(chunk_size, n_images - start), seed, chunk_index)
+
+
+def write_images(kind, out_dir, n_images, seed=42, chunk_size=IMAGE_CHUNK_SIZE):
+    """Write synthetic images as PNG files named <index>-<label>.png, one chunk at a time"""
+    from PIL import Image
+
+    os.makedirs(out_dir, exist_ok=True)
+    i = 0
+    for images, labels in iter_images(kind, n_images, seed, chunk_size):
+        for image, label in zip(images, labels):
+            mode = 'L' if image.shape[-1] == 1 else 'RGB'
+            Image.fromarray(image.squeeze(-1) if mode == 'L' else image, mode).save(
+                os.path.join(out_dir, f"{i:06d}-{label}.png")
+            )
+            i += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic patient data")
+    parser.add_argument("kind", choices=sorted(SCHEMAS) + ['symptoms'] + sorted(IMAGE_CHANNELS))
+    parser.add_argument("rows", type=int)
+    parser.add_argument("out")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-size", type=int,
+                        help=f"rows per chunk (default 100000, {IMAGE_CHUNK_SIZE} for images)")
+    args = parser.parse_args()
+    chunk_size = args.chunk_size or (IMAGE_CHUNK_SIZE if args.kind in IMAGE_CHANNELS else 100000)
+
+    if args.kind in IMAGE_CHANNELS:
+        write_images(args.kind, args.out, args.rows, args.seed, chunk_size)
+    elif args.kind == 'symptoms':
+        if args.out.endswith('.npy'):
+            write_symptom_npy(args.out, args.rows, args.seed, chunk_size)
+        else:
+            write_symptom_csv(args.out, args.rows, args.seed, chunk_size)
+    elif args.out.endswith('.npy'):
+        write_npy(args.kind, args.out, args.rows, args.seed, chunk_size)
+    else:
+        write_csv(args.kind, args.out, args.rows, args.seed, chunk_size)
+    print(f"Wrote {args.rows} {args.kind} rows to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
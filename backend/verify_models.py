@@ -0,0 +1,324 @@
+"""
+Prediction-equivalence check between an original model and a candidate.
+
+Scores a reference dataset through both models in parallel chunks and
+reports the exact label agreement rate, the largest probability delta
+and the rows that disagree. Use it before shipping any faster
+representation of a model: a re-exported forest, a compacted tree, the
+NumPy CNN engine instead of TensorFlow, or a pickle loaded under a
+different sklearn version.
+
+Usage:
+    python verify_models.py <reference> <candidate> (--data <rows.npy|rows.csv> | --synthetic <kind> --rows N)
+        [--label-column <name|index>] [--reference-loader compat] [--candidate-loader compat]
+        [--min-agreement 1.0] [--max-prob-delta 1e-6] [--workers N] [--chunk-size N]
+
+Loaders: compat (SklearnUnpickler), pickle (plain pickle), keras-lite
+(NumPy engine) and tensorflow. The exit status is 1 when a threshold fails.
+A candidate that returns no probabilities, or probabilities of another
+shape, fails the --max-prob-delta check whenever the reference returns
+them; probability_check in the report says whether deltas were compared.
+
+CSV files lose their label column by header name ('target' from
+synthetic_data.write_csv, 'disease' from write_symptom_csv), and a
+'symptoms' column of comma-separated names is encoded into symptom
+vectors. .npy files from synthetic_data.write_npy keep the label in the
+last column; pass --label-column -1 for those.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import pickle
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+
+# Label columns written by synthetic_data's CSV writers
+LABEL_COLUMNS = ('target', 'disease')
+
+
+def _load_compat(path):
+    from model_loader import load_model_safely
+    return load_model_safely(path)
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+def _load_keras_lite(path):
+    from keras_lite import load_model
+    return load_model(path)
+
+def _load_tensorflow(path):
+    # verbose=0 wrapper: the report goes to stdout
+    from keras_lite import load_tensorflow_model
+    return load_tensorflow_model(path)
+
+LOADERS = {
+    'compat': _load_compat,
+    'pickle': _load_pickle,
+    'keras-lite': _load_keras_lite,
+    'tensorflow': _load_tensorflow,
+}
+
+
+def default_loader_name(path):
+    return 'keras-lite' if path.endswith('.h5') else 'compat'
+
+
+def predict_outputs(model, X):
+    """Return (labels, probabilities or None) for a sklearn or Keras-style model"""
+    if hasattr(model, 'predict_proba') or hasattr(model, 'classes_'):
+        labels = np.asarray(model.predict(X))
+        try:
+            probability = np.asarray(model.predict_proba(X), dtype=np.float64)
+        except AttributeError:
+            probability = None
+        return labels, probability
+
+    # Keras-style models return scores; the label is the arg max (or a 0.5 cut for one output)
+    probability = np.asarray(model.predict(X), dtype=np.float64)
+    if probability.ndim == 1 or probability.shape[1] == 1:
+        labels = (probability.reshape(len(X)) > 0.5).astype(int)
+    else:
+        labels = probability.argmax(axis=1)
+    return labels, probability
+
+
+# Per-worker state, filled by _init_worker so each process loads the models once
+_worker = {}
+
+def _init_worker(reference_path, reference_loader, candidate_path, candidate_loader):
+    sys.path.insert(0, script_dir)
+    _worker['reference'] = LOADERS[reference_loader](reference_path)
+    _worker['candidate'] = LOADERS[candidate_loader](candidate_path)
+
+
+def _load_chunk(source):
+    """Materialize the rows described by a chunk source tuple"""
+    kind = source[0]
+    if kind == 'array':
+        return source[1]
+    if kind == 'npy':
+        _, path, start, stop, label_index = source
+        X = np.array(np.load(path, mmap_mode='r')[start:stop])
+        return X if label_index is None else np.delete(X, label_index, axis=1)
+    if kind == 'synthetic':
+        import synthetic_data
+        _, name, size, seed, index = source
+        if name in synthetic_data.IMAGE_CHANNELS:
+            return synthetic_data.generate_images(name, size, seed, index)[0]
+        if name == 'symptoms':
+            # Training.csv is parsed once per worker, from the bit-packed cache
+            if 'profiles' not in _worker:
+                from symptom_index import load_training_cached
+                _worker['profiles'] = load_training_cached()
+            profiles, diseases = _worker['profiles']
+            return synthetic_data.generate_symptom_chunk(profiles, diseases, size, seed, index)[0]
+        return synthetic_data.generate_chunk(name, size, seed, index)[0]
+    raise ValueError(f"Unknown chunk source: {kind}")
+
+
+def _prepare(model, X):
+    """Match the preprocessing of the prediction scripts"""
+    if X.ndim == 4:
+        # Image batch (N, 36, 36, C); the CNN scripts scale pixels to [0, 1]
+        return X.astype(np.float32) / 255.0 if X.dtype == np.uint8 else X.astype(np.float32)
+    return X.astype(np.float32)
+
+
+def score_chunk(task):
+    """Compare both models on one chunk; runs inside a worker process"""
+    offset, source, max_rows_reported = task
+    X = _load_chunk(source)
+    reference, candidate = _worker['reference'], _worker['candidate']
+    X = _prepare(reference, X)
+
+    ref_labels, ref_prob = predict_outputs(reference, X)
+    cand_labels, cand_prob = predict_outputs(candidate, X)
+
+    delta = None
+    probability_problem = None
+    if ref_prob is not None:
+        if cand_prob is None:
+            probability_problem = "candidate returns no probabilities"
+        elif ref_prob.shape != cand_prob.shape:
+            probability_problem = f"probability shapes differ: {ref_prob.shape} vs {cand_prob.shape}"
+        else:
+            delta = np.abs(ref_prob - cand_prob).max(axis=1)
+
+    disagree = np.flatnonzero(ref_labels != cand_labels)
+    rows = []
+    for i in disagree[:max_rows_reported]:
+        rows.append({
+            "row": int(offset + i),
+            "reference": ref_labels[i].item(),
+            "candidate": cand_labels[i].item(),
+            "delta": float(delta[i]) if delta is not None else None,
+        })
+    return {
+        "rows": len(X),
+        "disagreements": int(len(disagree)),
+        "max_delta": float(delta.max()) if delta is not None and len(delta) else None,
+        "sum_delta": float(delta.sum()) if delta is not None else None,
+        "reference_has_probability": ref_prob is not None,
+        "probability_problem": probability_problem,
+        "disagreeing_rows": rows,
+    }
+
+
+def _csv_features(frame, label_column=None):
+    """Feature matrix of a CSV chunk, without its label column"""
+    labels = [label_column] if label_column is not None else [c for c in LABEL_COLUMNS if c in frame.columns]
+    frame = frame.drop(columns=labels)
+    if 'symptoms' in frame.columns:
+        from synthetic_data import symptom_matrix
+        return symptom_matrix(frame['symptoms'].tolist())
+    return frame.to_numpy(dtype=np.float64)
+
+
+def plan_chunks(data=None, synthetic=None, rows=None, seed=42, chunk_size=50000, label_column=None):
+    """Yield (offset, source) pairs covering the reference dataset.
+
+    label_column names the CSV column, or gives the .npy column index, that
+    holds the label and must not reach the models.
+    """
+    if synthetic is not None:
+        from synthetic_data import IMAGE_CHANNELS, IMAGE_CHUNK_SIZE
+        if synthetic in IMAGE_CHANNELS:
+            chunk_size = min(chunk_size, IMAGE_CHUNK_SIZE)
+        for index, start in enumerate(range(0, rows, chunk_size)):
+            yield start, ('synthetic', synthetic, min(chunk_size, rows - start), seed, index)
+    elif data.endswith('.npy'):
+        total = np.load(data, mmap_mode='r').shape[0]
+        label_index = int(label_column) if label_column is not None else None
+        for start in range(0, total, chunk_size):
+            yield start, ('npy', data, start, min(start + chunk_size, total), label_index)
+    else:
+        import pandas as pd
+        start = 0
+        for frame in pd.read_csv(data, chunksize=chunk_size):
+            yield start, ('array', _csv_features(frame, label_column))
+            start += len(frame)
+
+
+def _bounded_map(pool, fn, tasks, limit):
+    """Like pool.map, but keeps at most limit tasks in flight so CSV chunks aren't all read up front"""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(fn, task))
+        if len(pending) >= limit:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def verify(reference_path, candidate_path, chunks, reference_loader=None, candidate_loader=None,
+           min_agreement=1.0, max_prob_delta=1e-6, workers=None, max_rows_reported=100):
+    """Score every chunk through both models in parallel and apply the thresholds"""
+    reference_loader = reference_loader or default_loader_name(reference_path)
+    candidate_loader = candidate_loader or default_loader_name(candidate_path)
+    init_args = (reference_path, reference_loader, candidate_path, candidate_loader)
+    # Load once up front so a bad model fails here with its own error
+    # instead of as a broken worker pool
+    LOADERS[reference_loader](reference_path)
+    LOADERS[candidate_loader](candidate_path)
+
+    total = disagreements = 0
+    max_delta = None
+    sum_delta = 0.0
+    have_delta = True
+    reference_has_probability = False
+    probability_problems = set()
+    disagreeing_rows = []
+    # TensorFlow deadlocks in forked children once the parent has loaded it
+    uses_tensorflow = 'tensorflow' in (reference_loader, candidate_loader)
+    context = multiprocessing.get_context('spawn') if uses_tensorflow else None
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker,
+                             initargs=init_args) as pool:
+        tasks = ((offset, source, max_rows_reported) for offset, source in chunks)
+        for result in _bounded_map(pool, score_chunk, tasks, 2 * (workers or os.cpu_count() or 1)):
+            total += result["rows"]
+            disagreements += result["disagreements"]
+            reference_has_probability = reference_has_probability or result["reference_has_probability"]
+            if result["probability_problem"]:
+                probability_problems.add(result["probability_problem"])
+            if result["max_delta"] is None:
+                have_delta = have_delta and result["rows"] == 0
+            else:
+                max_delta = result["max_delta"] if max_delta is None else max(max_delta, result["max_delta"])
+                sum_delta += result["sum_delta"]
+            room = max_rows_reported - len(disagreeing_rows)
+            disagreeing_rows.extend(result["disagreeing_rows"][:max(room, 0)])
+
+    agreement = 1.0 - disagreements / total if total else 1.0
+    failures = []
+    if agreement < min_agreement:
+        failures.append(f"agreement {agreement:.6f} is below {min_agreement}")
+    if max_prob_delta is not None:
+        # A requested delta threshold that could not be checked is a failure,
+        # not a pass; only a reference without probabilities exempts it
+        if probability_problems:
+            failures.extend(f"cannot check max probability delta: {p}" for p in sorted(probability_problems))
+        elif have_delta and max_delta is not None and max_delta > max_prob_delta:
+            failures.append(f"max probability delta {max_delta:.3g} exceeds {max_prob_delta}")
+
+    return {
+        "reference": {"path": reference_path, "loader": reference_loader},
+        "candidate": {"path": candidate_path, "loader": candidate_loader},
+        "rows": total,
+        "agreement": agreement,
+        "disagreements": disagreements,
+        "max_probability_delta": max_delta if have_delta else None,
+        "mean_probability_delta": sum_delta / total if have_delta and total else None,
+        "probability_check": (
+            "not applicable: reference returns no probabilities" if total and not reference_has_probability
+            else "failed" if probability_problems
+            else "compared"
+        ),
+        "disagreeing_rows": disagreeing_rows,
+        "passed": not failures,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that a candidate model predicts like the original")
+    parser.add_argument("reference")
+    parser.add_argument("candidate")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--data", help="reference rows as .npy or .csv")
+    source.add_argument("--synthetic", help="generate reference rows with synthetic_data (schema, symptoms, pneumonia or malaria)")
+    parser.add_argument("--rows", type=int, default=1000000, help="row count for --synthetic")
+    parser.add_argument("--label-column", help="label column to drop from --data: a CSV column name or a .npy column index")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--reference-loader", choices=sorted(LOADERS))
+    parser.add_argument("--candidate-loader", choices=sorted(LOADERS))
+    parser.add_argument("--min-agreement", type=float, default=1.0)
+    parser.add_argument("--max-prob-delta", type=float, default=1e-6)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--chunk-size", type=int, default=50000)
+    parser.add_argument("--max-rows-reported", type=int, default=100)
+    args = parser.parse_args()
+
+    chunks = plan_chunks(args.data, args.synthetic, args.rows, args.seed, args.chunk_size, args.label_column)
+    report = verify(
+        args.reference, args.candidate, chunks,
+        reference_loader=args.reference_loader,
+        candidate_loader=args.candidate_loader,
+        min_agreement=args.min_agreement,
+        max_prob_delta=args.max_prob_delta,
+        workers=args.workers,
+        max_rows_reported=args.max_rows_reported,
+    )
+    print(json.dumps(report, indent=2))
+    sys.exit(0 if report["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()